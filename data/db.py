@@ -1,9 +1,73 @@
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-DB_PATH = os.path.join(BASE_DIR, "data", "processed", "patient_data.db")
-DB_URI = f"sqlite:///{DB_PATH}"
+DB_PATH = os.getenv("DB_PATH", os.path.join(BASE_DIR, "data", "processed", "patient_data.db"))
+DB_URI = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
 
-def get_engine():
-    return create_engine(DB_URI, future=True)
\ No newline at end of file
+# Connection pool per engine; sized for a threaded Flask worker
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+# Applied to every new SQLite connection. WAL lets readers run during ingestion.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,       # 64 MB page cache
+    "mmap_size": 268435456,     # 256 MB memory-mapped I/O
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def _create_engine(uri):
+    if not uri.startswith("sqlite"):
+        return create_engine(uri, future=True, pool_pre_ping=True)
+
+    if uri in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection, otherwise every checkout sees a new empty database
+        engine = create_engine(
+            uri, future=True, poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    else:
+        engine = create_engine(
+            uri, future=True,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            connect_args={"check_same_thread": False},
+        )
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+def get_engine(uri=None):
+    """Return the process-wide engine for `uri` (defaults to DB_URI), creating it once"""
+    uri = uri or DB_URI
+    engine = _engines.get(uri)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(uri)
+            if engine is None:
+                engine = _create_engine(uri)
+                _engines[uri] = engine
+    return engine
+
+def dispose_engines(close=True):
+    """Drop every engine and its pool; use close=False in a forked child
+    so the parent's connections are left alone"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
+        _engines.clear()
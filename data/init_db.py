@@ -1,8 +1,8 @@
 from sqlalchemy import text
 from data.db import get_engine
 
-def init_db():
-    engine = get_engine()
+def init_db(engine=None):
+    engine = engine or get_engine()
     with engine.begin() as conn:
         conn.execute(text("""
              CREATE TABLE IF NOT EXISTS patient_records(
@@ -41,6 +41,11 @@ def init_db():
                           ingestion_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                           )
 """))
+        # Single-patient lookups: latest record per patient without a table scan
+        conn.execute(text("""
+             CREATE INDEX IF NOT EXISTS idx_patient_records_patient_id
+             ON patient_records(patient_id, id)
+"""))
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
@@ -1,18 +1,40 @@
 import os
+import json
 import pandas as pd
-from data.db import get_engine, DB_PATH
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from data import db
+from data.db import get_engine
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 CSV_PATH = os.path.join(BASE_DIR, "data", "raw", "synthetic_ehr.csv")
+# SQLite file behind the engine's URI (DATABASE_URL); None for server and in-memory
+# databases, which have no file to check and are taken to exist
+DB_PATH = make_url(db.DB_URI).database if db.DB_URI.startswith("sqlite") else None
+DB_PATH = DB_PATH if DB_PATH not in ("", ":memory:") else None
+# High-water mark of the last patient_records row merged into the processed dataset
+WATERMARK_PATH = os.path.join(os.path.dirname(db.DB_PATH), "extract_watermark.json")
 
 
-def extract_from_db():
-    if not os.path.exists(DB_PATH):
+def db_exists():
+    """Whether extract() reads from the database (rather than falling back to CSV/dummy data)"""
+    return DB_PATH is None or os.path.exists(DB_PATH)
+
+def extract_from_db(min_id=None):
+    """Extract patient records, optionally only those with id > min_id"""
+    if not db_exists():
         raise FileNotFoundError(f"Database not found at {DB_PATH}")
 
     engine = get_engine()
-    df = pd.read_sql("SELECT * FROM patient_records", engine)
-    print("Extracted data from Database")
+    if min_id is None:
+        df = pd.read_sql("SELECT * FROM patient_records", engine)
+    else:
+        df = pd.read_sql(
+            text("SELECT * FROM patient_records WHERE id > :min_id ORDER BY id"),
+            engine,
+            params={"min_id": int(min_id)},
+        )
+    print(f"Extracted {len(df)} rows from Database")
     return df
 
 def extract_from_csv():
@@ -61,6 +83,87 @@ def extract_dummy():
     return df
 
 
+def extract_patient(patient_id):
+    """Extract the latest record of one patient through idx_patient_records_patient_id"""
+    if not db_exists():
+        raise FileNotFoundError(f"Database not found at {DB_PATH}")
+
+    engine = get_engine()
+    return pd.read_sql(
+        text(
+            "SELECT * FROM patient_records WHERE patient_id = :patient_id "
+            "ORDER BY id DESC LIMIT 1"
+        ),
+        engine,
+        params={"patient_id": int(patient_id)},
+    )
+
+def read_watermark():
+    """Return the persisted high-water mark, or a zero mark if none exists"""
+    if not os.path.exists(WATERMARK_PATH):
+        return {"id": 0, "ingestion_timestamp": None}
+    with open(WATERMARK_PATH) as f:
+        return json.load(f)
+
+def write_watermark(watermark):
+    """Persist the high-water mark atomically"""
+    os.makedirs(os.path.dirname(WATERMARK_PATH), exist_ok=True)
+    tmp_path = f"{WATERMARK_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, WATERMARK_PATH)
+
+def watermark_from(df, previous=None):
+    """High-water mark covering the rows in df (falls back to previous when df is empty)"""
+    if df.empty or "id" not in df.columns:
+        return previous or {"id": 0, "ingestion_timestamp": None}
+    last = df.loc[df["id"].idxmax()]
+    return {"id": int(last["id"]), "ingestion_timestamp": str(last["ingestion_timestamp"])}
+
+def extract_incremental(watermark=None):
+    """Extract only rows ingested after the watermark.
+
+    Returns (df, new_watermark); persist new_watermark once the rows are loaded.
+    """
+    watermark = read_watermark() if watermark is None else watermark
+    df = extract_from_db(min_id=watermark["id"])
+    return df, watermark_from(df, previous=watermark)
+
+
+def extract_chunks(chunksize):
+    """Yield the source in chunks of at most `chunksize` rows (same fallback order as extract)"""
+    if db_exists():
+        engine = get_engine()
+        for chunk in pd.read_sql("SELECT * FROM patient_records ORDER BY id", engine, chunksize=chunksize):
+            yield chunk
+        print("Extracted data from Database in chunks")
+    elif os.path.exists(CSV_PATH):
+        for chunk in pd.read_csv(CSV_PATH, chunksize=chunksize):
+            yield chunk
+        print(f"Extracted data from CSV in chunks: {CSV_PATH}")
+    else:
+        yield extract_dummy()
+
+
+def source_key():
+    """Cheap fingerprint of the source extract() would read from.
+
+    DB: newest (id, ingestion_timestamp), a primary-key lookup on the
+    append-only patient_records table. CSV: file mtime and size.
+    """
+    if db_exists():
+        engine = get_engine()
+        with engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT id, ingestion_timestamp FROM patient_records ORDER BY id DESC LIMIT 1"
+            )).first()
+        return ("db", row[0] if row else 0, str(row[1]) if row else None)
+    if os.path.exists(CSV_PATH):
+        st = os.stat(CSV_PATH)
+        return ("csv", st.st_mtime_ns, st.st_size)
+    return ("dummy",)
+
+
 def extract():
     """Unified Extraction Function
     1. SQL (production-line)
@@ -73,5 +176,5 @@ def extract():
         df = extract_from_csv()
         if df is not None:
             return df
-        return extract_dummy
+        return extract_dummy()
 
@@ -1,12 +1,147 @@
+import numpy as np
 import pandas as pd
 import os
+import glob
+import json
+import shutil
+import uuid
+from schemas.patient_features import COLUMN_CONSTRAINTS, SchemaValidationError
 
 PROCESSED_DATA_PATH = os.path.join("data", "processed", "processed_ehr.csv")
+# Typed columnar store: a directory of Parquet part files, one per load/append
+PROCESSED_STORE_PATH = os.path.join("data", "processed", "processed_ehr.parquet")
 
-def load(df):
-    """Saved Processed Data"""
+# CSV is an optional export next to the Parquet store
+EXPORT_CSV = os.getenv("ETL_EXPORT_CSV", "0") == "1"
+
+# 0/1 symptom and type flags (PatientFeatures fields bounded by le=1)
+FLAG_COLUMNS = [col for col, rule in COLUMN_CONSTRAINTS.items() if rule["le"] == 1]
+
+
+def _column_dtype(rule):
+    """Fixed storage type of a PatientFeatures column: the smallest integer type holding its upper bound"""
+    if rule["le"] is None:
+        return "int32"
+    for dtype in ("int8", "int16", "int32"):
+        if rule["le"] <= np.iinfo(dtype).max:
+            return dtype
+    return "int64"
+
+# One dtype per column for every part, whatever values a part happens to hold,
+# so all parts of a store share one Arrow schema
+COLUMN_DTYPES = {col: _column_dtype(rule) for col, rule in COLUMN_CONSTRAINTS.items()}
+
+
+def _out_of_range(values, col):
+    """Row labels of non-missing values that are not whole numbers within the column's
+    PatientFeatures bounds and its storage type (these would wrap or truncate on the cast)"""
+    rule = COLUMN_CONSTRAINTS[col]
+    info = np.iinfo(COLUMN_DTYPES[col])
+    lower = info.min if rule["ge"] is None else max(rule["ge"], info.min)
+    upper = info.max if rule["le"] is None else min(rule["le"], info.max)
+
+    present = values.notna()
+    numbers = values[present].to_numpy(dtype="float64")
+    bad = (numbers != np.round(numbers)) | (numbers < lower) | (numbers > upper)
+    return values.index[present.to_numpy()][bad].tolist()
+
+def compact_dtypes(df):
+    """Store PatientFeatures columns as their fixed COLUMN_DTYPES and other integers as int64.
+
+    Raises SchemaValidationError if a constrained column holds values its
+    storage type cannot represent exactly.
+    """
+    df = df.copy()
+    errors = {}
+    for col in df.columns:
+        if col in COLUMN_DTYPES:
+            values = pd.to_numeric(df[col], errors="coerce")
+            bad_rows = _out_of_range(values, col)
+            if bad_rows:
+                errors[col] = bad_rows
+                continue
+            dtype = COLUMN_DTYPES[col]
+            # The nullable variant maps to the same Arrow type
+            df[col] = values.astype(dtype.capitalize() if values.isna().any() else dtype)
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("int64")
+    if errors:
+        raise SchemaValidationError(errors)
+    return df
+
+def write_parquet_part(df, store_path, append=False):
+    """Write df as a new part of a Parquet dataset directory (replacing it unless append)"""
+    # Validated before anything is replaced, so a bad batch leaves the store as it was
+    df = compact_dtypes(df)
+    if not append and os.path.exists(store_path):
+        shutil.rmtree(store_path)
+    os.makedirs(store_path, exist_ok=True)
+
+    # Zero-padded sequence keeps parts in load order when the directory is read back
+    n_parts = len(glob.glob(os.path.join(store_path, "part-*.parquet")))
+    part_path = os.path.join(store_path, f"part-{n_parts:05d}-{uuid.uuid4().hex[:8]}.parquet")
+    df.to_parquet(part_path, index=False)
+    return part_path
+
+def store_exists(store_path=None):
+    store_path = store_path or PROCESSED_STORE_PATH
+    return bool(glob.glob(os.path.join(store_path, "part-*.parquet")))
+
+def read_processed(columns=None, filters=None, store_path=None):
+    """Read the processed store.
+
+    `columns` projects only the listed columns and `filters` (pyarrow
+    DNF, e.g. [("patient_id", "==", 7)]) is pushed down to the reader.
+    """
+    store_path = store_path or PROCESSED_STORE_PATH
+    return pd.read_parquet(store_path, columns=columns, filters=filters)
+
+def write_snapshot(df, path, metadata=None):
+    """Write df as an uncompressed Arrow IPC file (atomically) so readers can memory-map it"""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"snapshot": json.dumps(metadata or {}).encode(),
+    })
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+def read_snapshot(path):
+    """Memory-map an Arrow snapshot; returns (df, metadata).
+
+    Numeric columns without nulls point straight into the mapped file
+    (read-only), so processes reading the same snapshot share its pages.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    metadata = json.loads((table.schema.metadata or {}).get(b"snapshot", b"{}"))
+    return table.to_pandas(split_blocks=True), metadata
+
+def export_csv(df, csv_path, append=False):
+    """Write df as CSV (append=True keeps the column order of the existing file)"""
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    if append and os.path.exists(csv_path):
+        header = pd.read_csv(csv_path, nrows=0).columns
+        df.reindex(columns=header).to_csv(csv_path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(csv_path, index=False)
+
+def load(df, append=False, export=None):
+    """Saved Processed Data (append=True merges new rows into the existing store)"""
     print("Loading data...")
-    os.makedirs(os.path.dirname(PROCESSED_DATA_PATH), exist_ok=True)
-    df.to_csv(PROCESSED_DATA_PATH, index=False)
-    print(f"Processed data saved to {PROCESSED_DATA_PATH}")
+    write_parquet_part(df, PROCESSED_STORE_PATH, append=append)
+    print(f"Processed data {'appended to' if append else 'saved to'} {PROCESSED_STORE_PATH}")
 
+    if EXPORT_CSV if export is None else export:
+        export_csv(df, PROCESSED_DATA_PATH, append=append)
+        print(f"CSV export written to {PROCESSED_DATA_PATH}")
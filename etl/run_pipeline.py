@@ -1,12 +1,212 @@
-from etl.extract.extract import extract
+import os
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+import pandas as pd
+from etl.extract.extract import (
+    extract, extract_chunks, extract_from_db, extract_incremental, extract_patient,
+    source_key, read_watermark, write_watermark, watermark_from,
+)
 from etl.transform.transform import transform
-from etl.load.load import load
+from etl.load import load as load_module
+from etl.load.load import load, read_snapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# Rows per chunk in streaming mode
+ETL_CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", 50_000))
+
+# Arrow file with the last transformed dataset, memory-mapped by every serving
+# process (unset: the dataset is only cached in process memory)
+SNAPSHOT_PATH = os.getenv("PIPELINE_SNAPSHOT_PATH")
+
+# Last transformed dataset, reused by requests until the source changes.
+# patient_index maps patient_id -> row position of that patient's latest record.
+PipelineResult = namedtuple("PipelineResult", ["source_key", "df", "patient_index"])
+
+_pipeline_cache = None
+_cache_lock = threading.Lock()
+
 
 def run_pipeline():
-    df = extract()
-    df = transform(df)
+    raw = extract()
+    df = transform(raw)
     load(df)
+    # A full DB run also moves the incremental watermark forward
+    if "id" in raw.columns:
+        write_watermark(watermark_from(raw))
+    return df
+
+def iter_pipeline(chunksize=ETL_CHUNK_SIZE, write=True):
+    """Stream extract -> transform -> load one chunk at a time.
+
+    Yields each transformed chunk; with write=True the chunks are appended to
+    the processed dataset as they pass through, so peak memory is one chunk.
+    """
+    watermark = None
+    for i, raw in enumerate(extract_chunks(chunksize)):
+        df = transform(raw)
+        if write:
+            load(df, append=i > 0)
+        if "id" in raw.columns:
+            watermark = watermark_from(raw, previous=watermark)
+        yield df
+
+    if write and watermark is not None:
+        write_watermark(watermark)
+
+def run_pipeline_chunked(chunksize=ETL_CHUNK_SIZE):
+    """Run the full pipeline in streaming mode and return the number of rows processed"""
+    n_rows = 0
+    for df in iter_pipeline(chunksize):
+        n_rows += len(df)
+    print(f"Streaming pipeline processed {n_rows} rows")
+    return n_rows
+
+def run_incremental_pipeline():
+    """Extract rows ingested since the last run and merge them into the processed dataset"""
+    watermark = read_watermark()
+    if not load_module.store_exists():
+        # Nothing persisted to merge into: rebuild from the first row
+        watermark = {"id": 0, "ingestion_timestamp": None}
+
+    raw, new_watermark = extract_incremental(watermark)
+    if raw.empty:
+        print(f"No new rows since id {watermark['id']}")
+        return transform(raw)
+
+    df = transform(raw)
+    load(df, append=watermark["id"] > 0)
+    write_watermark(new_watermark)
+    print(f"Incremental run merged {len(df)} rows (watermark id {new_watermark['id']})")
     return df
 
+def _index_patients(df, start=0, index=None):
+    """Map patient_id -> row position, later records overriding earlier ones"""
+    index = dict(index or {})
+    if "patient_id" in df.columns:
+        index.update(zip(df["patient_id"].iloc[start:].tolist(), range(start, len(df))))
+    return index
+
+def _refresh(cached, key):
+    """Rebuild the cached dataset, pulling only new DB rows when possible"""
+    if cached is not None and cached.source_key[0] == key[0] == "db" and key[1] >= cached.source_key[1]:
+        new_rows = extract_from_db(min_id=cached.source_key[1])
+        if new_rows.empty:
+            return PipelineResult(key, cached.df, cached.patient_index)
+        df = pd.concat([cached.df, transform(new_rows)], ignore_index=True)
+        return PipelineResult(key, df, _index_patients(df, len(cached.df), cached.patient_index))
+
+    df = transform(extract())
+    return PipelineResult(key, df, _index_patients(df))
+
+def _from_snapshot(key):
+    """PipelineResult mapped from the shared snapshot, if one exists for `key`"""
+    if not SNAPSHOT_PATH or not os.path.exists(SNAPSHOT_PATH):
+        return None
+    try:
+        df, metadata = read_snapshot(SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable pipeline snapshot {SNAPSHOT_PATH}: {e}")
+        return None
+    if tuple(metadata.get("source_key", ())) != tuple(key):
+        return None
+    return PipelineResult(key, df, _index_patients(df))
+
+@contextmanager
+def _snapshot_lock():
+    """Exclusive lock on the snapshot across processes, so only one of them rebuilds it"""
+    os.makedirs(os.path.dirname(os.path.abspath(SNAPSHOT_PATH)), exist_ok=True)
+    with open(f"{SNAPSHOT_PATH}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _refresh_shared(cached, key):
+    """Reuse another process's snapshot for `key`, or rebuild and publish one.
+
+    Processes that miss the snapshot queue on its lock; the first rebuilds it
+    and the rest map the file it wrote instead of rebuilding too.
+    """
+    if not SNAPSHOT_PATH:
+        return _refresh(cached, key)
+
+    result = _from_snapshot(key)
+    if result is not None:
+        return result
+
+    with _snapshot_lock():
+        result = _from_snapshot(key)
+        if result is not None:
+            return result
+        result = _refresh(cached, key)
+        write_snapshot(result.df, SNAPSHOT_PATH, {"source_key": list(key)})
+    # Serve from the mapped file too, so this process holds no private copy
+    return _from_snapshot(key) or result
+
+def _cached_result():
+    """Return the PipelineResult for the current source, refreshing it if stale"""
+    global _pipeline_cache
+    key = source_key()
+
+    cached = _pipeline_cache
+    if cached is not None and cached.source_key == key:
+        return cached
+
+    with _cache_lock:
+        cached = _pipeline_cache
+        if cached is None or cached.source_key != key:
+            cached = _refresh_shared(cached, key)
+            _pipeline_cache = cached
+        return cached
+
+def load_processed_data():
+    """Return the transformed dataset for read-only use, without writing it to disk.
+
+    The result is cached per process and refreshed only when source_key()
+    changes; new database rows are appended incrementally. With
+    SNAPSHOT_PATH set, processes share one memory-mapped copy and only the
+    first to see a new source key re-runs the ETL. Treat it as read-only.
+    """
+    return _cached_result().df
+
+def lookup_patient(patient_id):
+    """Return the latest transformed record for one patient (empty frame if unknown).
+
+    With a database this is an indexed query for that patient only; otherwise
+    the cached dataset is looked up through its patient_id index.
+    """
+    patient_id = int(patient_id)
+    try:
+        raw = extract_patient(patient_id)
+    except FileNotFoundError:
+        cached = _cached_result()
+        position = cached.patient_index.get(patient_id)
+        if position is None:
+            return cached.df.iloc[0:0]
+        return cached.df.iloc[[position]]
+    return transform(raw)
+
+def clear_pipeline_cache():
+    """Forget the cached dataset so the next call re-runs the full ETL"""
+    global _pipeline_cache
+    with _cache_lock:
+        _pipeline_cache = None
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    if "--incremental" in sys.argv:
+        # Runs run_incremental_pipeline, then drift-checks and pre-scores the new rows
+        from predict.predict_aura import predict_new_records
+        predict_new_records()
+    elif "--chunked" in sys.argv:
+        run_pipeline_chunked()
+    else:
+        run_pipeline()
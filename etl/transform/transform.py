@@ -11,10 +11,23 @@ EXPECTED_COLS = [
         "Type_Typical aura without migraine"
     ]
 
+# patient_records column names that differ from the model feature names
+DB_COLUMN_ALIASES = {
+    "Type_Familial_hemiplegic_migraine": "Type_Familial hemiplegic migraine",
+    "Type_Migraine_no_aura": "Type_Migraine without aura",
+    "Type_Sporadic_hemiplegic_migraine": "Type_Sporadic hemiplegic migraine",
+    "Type_Typical_aura_with_migraine": "Type_Typical aura with migraine",
+    "Type_Typical_aura_without_migraine": "Type_Typical aura without migraine",
+}
+
+# Passed through untouched when present (not model features)
+METADATA_COLS = ["ingestion_timestamp"]
+
 
 def transform(df):
     """Transform raw EHR data into model-ready format"""
     print("Transforming data...")
+    df = df.rename(columns=DB_COLUMN_ALIASES)
 
     # Add missing columns with default 0
     for col in EXPECTED_COLS:
@@ -26,6 +39,7 @@ def transform(df):
         columns.append("Visual")
     if "patient_id" in df.columns:
         columns.append("patient_id")
+    columns += [col for col in METADATA_COLS if col in df.columns]
 
     df = df[columns]
     
@@ -0,0 +1,17 @@
+# Production serving: gunicorn (run from the repository root)
+import multiprocessing
+import os
+
+wsgi_app = "webapp.wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# One worker per core; the model and dataset are loaded before forking
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("WEB_THREADS", 1))
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", 120))
+
+
+def post_fork(server, worker):
+    from webapp.wsgi import post_fork_reset
+    post_fork_reset()
@@ -1,6 +1,17 @@
+import os
 import numpy as np
 import pandas as pd
 
+# Frozen baseline histograms, saved in each model version folder
+DRIFT_BASELINE_FILE = "drift_baseline.npz"
+# Integer features with at most this many distinct values get one bin per value
+MAX_CATEGORIES = 10
+# Rows binned per vectorized pass (bounds the n x features x edges comparison block)
+BINNING_CHUNK_ROWS = 65_536
+
+_baseline_cache = {}
+
+
 def population_stability_index(expected, actual, bins=10):
     expected_perc, _ = np.histogram(expected, bins=bins)
     actual_perc, _ = np.histogram(actual, bins=bins)
@@ -12,4 +23,101 @@ def population_stability_index(expected, actual, bins=10):
         (expected_perc - actual_perc) *
         np.log((expected_perc + 1e-6) / (actual_perc + 1e-6))
     )
-    return psi
\ No newline at end of file
+    return psi
+
+def _feature_edges(values, bins):
+    """Bin edges for one baseline column; a value's bin is the number of edges at or below it.
+
+    Values below or above the baseline range get an underflow/overflow bin.
+    """
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.array([])
+    uniques = np.unique(values)
+    if uniques.size == 1 or (uniques.size <= MAX_CATEGORIES and np.all(uniques == np.round(uniques))):
+        # Binary/categorical (or constant): one bin per observed value, with
+        # separate bins for unseen values between, below and above them
+        return np.column_stack([uniques, np.nextafter(uniques, np.inf)]).ravel()
+    edges = np.linspace(uniques[0], uniques[-1], bins + 1)
+    # The maximum stays in the last regular bin; only larger values overflow
+    edges[-1] = np.nextafter(edges[-1], np.inf)
+    return edges
+
+def bin_counts(baseline, X):
+    """Histogram every feature of X on the baseline edges in one vectorized pass.
+
+    Returns an (n_features, n_bins) count matrix comparable to baseline["counts"].
+    """
+    X = np.asarray(X[baseline["features"]] if isinstance(X, pd.DataFrame) else X, dtype="float64")
+    edges = baseline["edges"]
+    n_features, n_edges = edges.shape
+    n_bins = n_edges + 1
+    offsets = np.arange(n_features) * n_bins
+
+    counts = np.zeros(n_features * n_bins, dtype="int64")
+    for start in range(0, len(X), BINNING_CHUNK_ROWS):
+        block = X[start:start + BINNING_CHUNK_ROWS]
+        # Bin index = number of edges at or below the value; padding edges are +inf
+        idx = (block[:, :, None] >= edges[None, :, :]).sum(axis=2)
+        valid = ~np.isnan(block)
+        counts += np.bincount((idx + offsets)[valid], minlength=n_features * n_bins)
+    return counts.reshape(n_features, n_bins)
+
+def fit_baseline(X, bins=10):
+    """Freeze per-feature bin edges and counts from a baseline feature frame"""
+    features = list(X.columns)
+    values = X.to_numpy(dtype="float64")
+    per_feature = [_feature_edges(values[:, j], bins) for j in range(values.shape[1])]
+
+    width = max((len(e) for e in per_feature), default=0)
+    edges = np.full((len(features), width), np.inf)
+    for j, e in enumerate(per_feature):
+        edges[j, :len(e)] = e
+
+    baseline = {"features": features, "edges": edges}
+    baseline["counts"] = bin_counts(baseline, values)
+    return baseline
+
+def psi_from_counts(expected_counts, actual_counts):
+    """PSI per feature from two (n_features, n_bins) count matrices"""
+    expected = expected_counts / np.maximum(expected_counts.sum(axis=1, keepdims=True), 1)
+    actual = actual_counts / np.maximum(actual_counts.sum(axis=1, keepdims=True), 1)
+    return np.sum((expected - actual) * np.log((expected + 1e-6) / (actual + 1e-6)), axis=1)
+
+def feature_psi(baseline, X=None, counts=None):
+    """{"PSI_<feature>": value} for current data X (or pre-accumulated bin counts)"""
+    if counts is None:
+        counts = bin_counts(baseline, X)
+    psi = psi_from_counts(baseline["counts"], counts)
+    return {f"PSI_{name}": float(value) for name, value in zip(baseline["features"], psi)}
+
+def save_baseline(baseline, version_dir):
+    path = os.path.join(version_dir, DRIFT_BASELINE_FILE)
+    np.savez(
+        path,
+        features=np.array(baseline["features"], dtype=str),
+        edges=baseline["edges"],
+        counts=baseline["counts"],
+    )
+    return path
+
+def load_baseline(version_dir):
+    """Load the frozen baseline of a model version (None if it has none), cached by mtime"""
+    path = os.path.join(version_dir, DRIFT_BASELINE_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _baseline_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with np.load(path) as data:
+        baseline = {
+            "features": data["features"].tolist(),
+            "edges": data["edges"],
+            "counts": data["counts"],
+        }
+    _baseline_cache[path] = (mtime, baseline)
+    return baseline
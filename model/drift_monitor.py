@@ -0,0 +1,195 @@
+import os
+import hashlib
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from data.db import get_engine
+from model.drift import bin_counts, feature_psi, load_baseline
+from model.metrics import METRICS_DB_URI, log_metrics
+
+# Tumbling window width; sliding windows are unions of the most recent ones
+DRIFT_WINDOW_SECONDS = int(os.getenv("DRIFT_WINDOW_SECONDS", 3600))
+# Windows kept per version and baseline (one week of hourly windows by default)
+DRIFT_RETAIN_WINDOWS = int(os.getenv("DRIFT_RETAIN_WINDOWS", 168))
+
+# Window counts shared by every process (a table next to the metrics snapshots)
+DRIFT_DB_URI = os.getenv("DRIFT_DATABASE_URL", METRICS_DB_URI)
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _init_store(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS drift_windows(
+                version TEXT NOT NULL,
+                baseline TEXT NOT NULL,
+                window_start INTEGER NOT NULL,
+                feature TEXT NOT NULL,
+                bin INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (version, baseline, window_start, feature, bin)
+            )
+        """))
+
+def _store():
+    """Engine for the drift window store, creating the table once"""
+    uri = DRIFT_DB_URI
+    engine = get_engine(uri)
+    if uri not in _initialized:
+        with _init_lock:
+            if uri not in _initialized:
+                _init_store(engine)
+                _initialized.add(uri)
+    return engine
+
+def baseline_digest(baseline):
+    """Short content hash of a baseline's bin edges; window counts are only comparable under the same edges"""
+    digest = hashlib.sha1("\0".join(baseline["features"]).encode())
+    digest.update(np.ascontiguousarray(baseline["edges"], dtype="float64").tobytes())
+    return digest.hexdigest()[:16]
+
+
+class DriftMonitor:
+    """Online drift monitor for one model version.
+
+    Incoming rows are binned on the version's frozen baseline edges and their
+    counts added to the tumbling window of their ingestion_timestamp. Window
+    counts live in a SQLite table keyed by (version, baseline, window_start,
+    feature, bin) and are added with upserts, so every process feeds and
+    reads the same windows, any range of them rolls up by addition, and PSI
+    never rescans history.
+    """
+
+    def __init__(self, baseline, version=None, window_seconds=DRIFT_WINDOW_SECONDS, retain=DRIFT_RETAIN_WINDOWS):
+        self.baseline = baseline
+        self.version = "" if version is None else str(version)
+        self.window_seconds = int(window_seconds)
+        self.retain = int(retain)
+        self._key = {"version": self.version, "baseline": baseline_digest(baseline)}
+
+    def _window_start(self, seconds):
+        return seconds - seconds % self.window_seconds
+
+    def _window_keys(self, n, timestamps):
+        """Window start (epoch seconds) per row; rows without a timestamp fall in the current window"""
+        now = self._window_start(int(time.time()))
+        if timestamps is None:
+            return np.full(n, now, dtype="int64")
+        ts = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True, errors="coerce"))
+        seconds = ts.as_unit("s").asi8
+        keys = seconds - seconds % self.window_seconds
+        keys[ts.isna()] = now
+        return keys
+
+    def observe(self, X, timestamps=None):
+        """Add the rows of X to their windows and return the bin counts they contributed"""
+        features = self.baseline["features"]
+        if isinstance(X, pd.DataFrame):
+            X = X.reindex(columns=features)
+        values = np.asarray(X, dtype="float64")
+        keys = self._window_keys(len(values), timestamps)
+
+        total = np.zeros_like(self.baseline["counts"])
+        rows = []
+        for key in np.unique(keys):
+            counts = bin_counts(self.baseline, values[keys == key])
+            total += counts
+            for j, b in zip(*np.nonzero(counts)):
+                rows.append({**self._key, "window_start": int(key), "feature": features[j],
+                             "bin": int(b), "count": int(counts[j, b])})
+        if not rows:
+            return total
+
+        with _store().begin() as conn:
+            conn.execute(text("""
+                INSERT INTO drift_windows (version, baseline, window_start, feature, bin, count)
+                VALUES (:version, :baseline, :window_start, :feature, :bin, :count)
+                ON CONFLICT (version, baseline, window_start, feature, bin)
+                DO UPDATE SET count = count + excluded.count
+            """), rows)
+            # Drop windows that fell out of the retention horizon
+            conn.execute(text("""
+                DELETE FROM drift_windows
+                WHERE version = :version AND baseline = :baseline AND window_start <= (
+                    SELECT MAX(window_start) FROM drift_windows WHERE version = :version AND baseline = :baseline
+                ) - :span
+            """), {**self._key, "span": self.retain * self.window_seconds})
+        return total
+
+    def window_starts(self):
+        """Start (epoch seconds) of every stored window, oldest first"""
+        with _store().connect() as conn:
+            return conn.execute(text("""
+                SELECT DISTINCT window_start FROM drift_windows
+                WHERE version = :version AND baseline = :baseline ORDER BY window_start
+            """), self._key).scalars().all()
+
+    def window_counts(self, windows=1, end=None):
+        """Merged counts of the `windows` most recent windows up to `end` (epoch seconds, default now)"""
+        end_key = self._window_start(int(time.time() if end is None else end))
+        start_key = end_key - (windows - 1) * self.window_seconds
+
+        with _store().connect() as conn:
+            rows = conn.execute(text("""
+                SELECT feature, bin, SUM(count) FROM drift_windows
+                WHERE version = :version AND baseline = :baseline AND window_start BETWEEN :start AND :end
+                GROUP BY feature, bin
+            """), {**self._key, "start": start_key, "end": end_key}).all()
+
+        counts = np.zeros_like(self.baseline["counts"])
+        position = {name: j for j, name in enumerate(self.baseline["features"])}
+        for feature, b, count in rows:
+            if feature in position:
+                counts[position[feature], b] += count
+        return counts
+
+    def rows(self, windows=1, end=None):
+        counts = self.window_counts(windows, end)
+        return int(counts[0].sum()) if len(counts) else 0
+
+    def psi(self, windows=1, end=None):
+        """{"PSI_<feature>": value} for the current window(s); empty when they hold no rows"""
+        counts = self.window_counts(windows, end)
+        if not len(counts) or counts[0].sum() == 0:
+            return {}
+        return feature_psi(self.baseline, counts=counts)
+
+    def log_drift(self, version, windows=1, end=None):
+        """Log the current window PSI as a metrics snapshot for `version`"""
+        psi = self.psi(windows, end)
+        if not psi:
+            return None
+        metrics = {**psi, "Drift_Window_Rows": self.rows(windows, end)}
+        log_metrics(version, metrics)
+        return metrics
+
+
+def get_monitor(version, version_dir):
+    """Monitor of a model version, or None if the version has no drift baseline.
+
+    A new monitor is started when the version's baseline file changes; its
+    windows are the shared ones stored for that version and baseline.
+    """
+    baseline = load_baseline(version_dir)
+    if baseline is None:
+        return None
+
+    monitor = _monitors.get(version)
+    if monitor is None or monitor.baseline is not baseline:
+        with _monitors_lock:
+            monitor = _monitors.get(version)
+            if monitor is None or monitor.baseline is not baseline:
+                monitor = DriftMonitor(baseline, version)
+                _monitors[version] = monitor
+    return monitor
+
+def clear_monitors():
+    with _monitors_lock:
+        _monitors.clear()
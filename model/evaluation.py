@@ -0,0 +1,172 @@
+import os
+import json
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+from sklearn.model_selection import train_test_split
+from model.save_best_model import dataset_fingerprint
+
+# Held-out fractions of each dataset; the rest is used for training
+EVAL_TEST_SIZE = float(os.getenv("EVAL_TEST_SIZE", 0.2))
+EVAL_VALIDATION_SIZE = float(os.getenv("EVAL_VALIDATION_SIZE", 0.1))
+SPLIT_SEED = 42
+# Smallest class count that still gets a held-out split
+MIN_CLASS_ROWS = 10
+
+BOOTSTRAP_SAMPLES = int(os.getenv("BOOTSTRAP_SAMPLES", 1000))
+BOOTSTRAP_ALPHA = 0.05
+# Upper bound on resamples x rows materialized per vectorized block
+BOOTSTRAP_BLOCK_CELLS = 5_000_000
+
+# Evaluations stored in each version folder, keyed by data fingerprint
+EVALUATION_FILE = "evaluation.json"
+# Entries kept in memory (least recently used dropped first)
+SPLIT_CACHE_SIZE = int(os.getenv("SPLIT_CACHE_SIZE", 4))
+EVALUATION_CACHE_SIZE = 64
+
+# Positional row indices of each part; held_out is False when the data was too small to split
+DatasetSplit = namedtuple("DatasetSplit", ["fingerprint", "train", "validation", "test", "held_out"])
+
+_split_cache = OrderedDict()
+_evaluation_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(cache, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache, key, value, size):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+
+def split_dataset(X, y, fingerprint=None):
+    """Deterministic stratified train/validation/test split, computed once per dataset fingerprint"""
+    fingerprint = fingerprint or dataset_fingerprint(X, y)
+    split = _cache_get(_split_cache, fingerprint)
+    if split is not None:
+        return split
+
+    y = np.asarray(y)
+    rows = np.arange(len(y))
+    counts = np.unique(y, return_counts=True)[1]
+    if len(counts) < 2 or counts.min() < MIN_CLASS_ROWS:
+        print("Too few rows per class for a held-out split; evaluating on the training rows.")
+        split = DatasetSplit(fingerprint, rows, rows[:0], rows, False)
+    else:
+        rest, test = train_test_split(rows, test_size=EVAL_TEST_SIZE, stratify=y, random_state=SPLIT_SEED)
+        train, validation = train_test_split(
+            rest,
+            test_size=EVAL_VALIDATION_SIZE / (1 - EVAL_TEST_SIZE),
+            stratify=y[rest],
+            random_state=SPLIT_SEED,
+        )
+        split = DatasetSplit(fingerprint, np.sort(train), np.sort(validation), np.sort(test), True)
+
+    _cache_put(_split_cache, fingerprint, split, SPLIT_CACHE_SIZE)
+    return split
+
+def _resample_counts(n, n_boot, rng):
+    """Yield (block, n) matrices of how often each row is drawn in each bootstrap resample"""
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // max(n, 1))
+    for start in range(0, n_boot, block):
+        b = min(block, n_boot - start)
+        draws = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        yield np.bincount(draws.ravel(), minlength=b * n).reshape(b, n)
+
+def _weighted_auc(y_true, y_prob, weights):
+    """AUC per row of `weights` (resample counts), via tie-aware rank sums"""
+    order = np.argsort(y_prob, kind="stable")
+    y_sorted = y_true[order]
+    # Start index of every group of tied scores
+    starts = np.flatnonzero(np.r_[True, np.diff(y_prob[order]) != 0])
+
+    w = weights[:, order]
+    pos = np.add.reduceat(w * (y_sorted == 1), starts, axis=1)
+    neg = np.add.reduceat(w * (y_sorted == 0), starts, axis=1)
+    below = np.cumsum(neg, axis=1) - neg
+
+    n_pos, n_neg = pos.sum(axis=1), neg.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (pos * (below + 0.5 * neg)).sum(axis=1) / (n_pos * n_neg)
+
+def bootstrap_metrics(y_true, y_pred, y_prob, n_boot=BOOTSTRAP_SAMPLES, alpha=BOOTSTRAP_ALPHA, seed=SPLIT_SEED):
+    """Accuracy and AUC with percentile bootstrap confidence intervals.
+
+    All resamples are scored at once from a matrix of per-row draw counts
+    instead of re-indexing the arrays once per resample.
+    """
+    y_true = np.asarray(y_true).astype(int)
+    y_pred = np.asarray(y_pred).astype(int)
+    y_prob = np.asarray(y_prob, dtype="float64")
+    n = len(y_true)
+    ones = np.ones((1, n))
+    correct = (y_true == y_pred).astype("float64")
+
+    accuracy, auc = [], []
+    for counts in _resample_counts(n, n_boot, np.random.default_rng(seed)):
+        accuracy.append(counts @ correct / n)
+        auc.append(_weighted_auc(y_true, y_prob, counts))
+    accuracy, auc = np.concatenate(accuracy), np.concatenate(auc)
+
+    q = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    metrics = {
+        "Accuracy": float(correct.mean()),
+        "AUC": float(_weighted_auc(y_true, y_prob, ones)[0]),
+        "Test_Rows": n,
+    }
+    for name, values in (("Accuracy", accuracy), ("AUC", auc)):
+        values = values[~np.isnan(values)]
+        low, high = np.percentile(values, q) if values.size else (np.nan, np.nan)
+        metrics[f"{name}_CI_Low"] = float(low)
+        metrics[f"{name}_CI_High"] = float(high)
+    return metrics
+
+def load_evaluation(version_dir, fingerprint):
+    """Stored evaluation of the model in version_dir on a dataset fingerprint, or None"""
+    key = (version_dir, fingerprint)
+    metrics = _cache_get(_evaluation_cache, key)
+    if metrics is not None:
+        return metrics
+
+    path = os.path.join(version_dir, EVALUATION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        metrics = json.load(f).get(fingerprint)
+    if metrics is not None:
+        _cache_put(_evaluation_cache, key, metrics, EVALUATION_CACHE_SIZE)
+    return metrics
+
+def save_evaluation(version_dir, fingerprint, metrics):
+    path = os.path.join(version_dir, EVALUATION_FILE)
+    stored = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+    stored[fingerprint] = metrics
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stored, f, indent=2)
+    os.replace(tmp_path, path)
+    _cache_put(_evaluation_cache, (version_dir, fingerprint), metrics, EVALUATION_CACHE_SIZE)
+
+def evaluate_model(model, X, y, version_dir, fingerprint=None):
+    """Bootstrapped held-out metrics of a model on (X, y), reused while the data fingerprint is unchanged"""
+    fingerprint = fingerprint or dataset_fingerprint(X, y)
+    metrics = load_evaluation(version_dir, fingerprint)
+    if metrics is not None:
+        return metrics
+
+    y_prob = model.predict_proba(X)[:, 1]
+    metrics = bootstrap_metrics(y, model.predict(X), y_prob)
+    save_evaluation(version_dir, fingerprint, metrics)
+    return metrics
@@ -0,0 +1,174 @@
+import os
+import joblib
+import numpy as np
+from datetime import datetime
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+from etl.extract.extract import extract_from_db, extract_incremental, watermark_from
+from etl.transform.transform import transform, EXPECTED_COLS
+from predict.model_loader import get_active_version, version_dir as active_version_dir
+from model.drift import bin_counts, fit_baseline, load_baseline, save_baseline
+from model.metrics import log_metrics
+from model.retrain import MODEL_DIR, register_version
+from model.registry import new_version_dir, file_sha256
+from predict.linear_model import export_linear_model
+from predict.prediction_store import warm_predictions
+
+# Optimizer state saved next to every incrementally updated model
+ONLINE_STATE_FILE = "online_state.joblib"
+# Passes over each batch of new records, and SGD step size schedule
+ONLINE_EPOCHS = int(os.getenv("ONLINE_EPOCHS", 5))
+ONLINE_ALPHA = float(os.getenv("ONLINE_ALPHA", 1e-4))
+
+TARGET_COL = "Visual"
+CLASSES = np.array([0, 1])
+
+
+def load_online_state(version_dir):
+    path = os.path.join(version_dir, ONLINE_STATE_FILE)
+    return joblib.load(path) if os.path.exists(path) else None
+
+def _seed_state():
+    """Fresh scaler + SGD logistic model, with the scaler fitted on the whole history.
+
+    The scaler is frozen after seeding so later updates keep working in the
+    same standardized space as the coefficients learned so far.
+    """
+    raw = extract_from_db()
+    state = {
+        "scaler": StandardScaler(),
+        "sgd": SGDClassifier(loss="log_loss", alpha=ONLINE_ALPHA, random_state=42),
+        "watermark": {"id": 0, "ingestion_timestamp": None},
+        "n_seen": 0,
+    }
+    X, _ = _training_frame(raw)
+    if len(X):
+        state["scaler"].fit(X)
+    return state, raw
+
+def _training_frame(raw):
+    df = transform(raw)
+    df = df[df[TARGET_COL].notna()]
+    return df[EXPECTED_COLS].astype("float64"), df[TARGET_COL].astype(int)
+
+def to_logistic_regression(scaler, sgd, feature_names):
+    """Fold the scaler into the SGD weights, giving a LogisticRegression on raw features"""
+    scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_)
+    coef = sgd.coef_ / scale
+    intercept = sgd.intercept_ - (sgd.coef_ * scaler.mean_ / scale).sum(axis=1)
+
+    model = LogisticRegression()
+    model.classes_ = sgd.classes_
+    model.coef_ = coef
+    model.intercept_ = intercept
+    model.n_features_in_ = len(feature_names)
+    model.n_iter_ = np.array([sgd.n_iter_])
+    model.feature_names_in_ = list(feature_names)
+    return model
+
+def _no_progress(fraction, message):
+    pass
+
+class NoOnlineState(ValueError):
+    """The base version has no saved scaler/SGD state to update incrementally"""
+
+
+def retrain_incremental(progress=_no_progress):
+    """Update the active model with only the records ingested since it was trained.
+
+    The active version's scaler/SGD state is restored, partial_fit runs on
+    the new rows, and the result is written as a new version. A version
+    without online state (e.g. one from a full retrain) is refused rather
+    than replaced by a model fitted from scratch; seed_online_model starts one.
+    """
+    base_version = get_active_version()
+    state = load_online_state(active_version_dir(base_version))
+    if state is None:
+        raise NoOnlineState(
+            f"Version {base_version} has no online state, so it cannot be updated incrementally. "
+            "Seed an online model from the full history first: python -m model.incremental --seed"
+        )
+
+    progress(0.0, "Extracting new records")
+    raw, _ = extract_incremental(state["watermark"])
+    return _update(base_version, state, raw, progress, extend_baseline=True)
+
+def seed_online_model(progress=_no_progress):
+    """Fit a new online (scaler + SGD) model on the whole history and activate it.
+
+    Reads every record once; later incremental updates start from its state.
+    """
+    base_version = get_active_version()
+    progress(0.0, "Extracting full history")
+    state, raw = _seed_state()
+    print(f"Seeding an online model from {len(raw)} records")
+    return _update(base_version, state, raw, progress, extend_baseline=False)
+
+def _update(base_version, state, raw, progress, extend_baseline):
+    """partial_fit state on raw, then write, register and warm the new version.
+
+    With extend_baseline the base version's drift histograms are carried
+    over and raw's rows added; otherwise the baseline is fitted on raw.
+    """
+    new_watermark = watermark_from(raw, previous=state["watermark"])
+
+    X, y = _training_frame(raw)
+    if X.empty:
+        print(f"No new records since id {state['watermark']['id']}. Skipping update.")
+        return None
+
+    scaler, sgd = state["scaler"], state["sgd"]
+    Xs = scaler.transform(X)
+
+    # Prequential metrics: the previous weights scored on data they have not seen
+    metrics = {"Rows_Updated": len(X)}
+    if state["n_seen"]:
+        y_pred = sgd.predict(Xs)
+        metrics["Accuracy"] = round(accuracy_score(y, y_pred), 4)
+        if y.nunique() == 2:
+            metrics["AUC"] = round(roc_auc_score(y, sgd.predict_proba(Xs)[:, 1]), 4)
+
+    progress(0.2, f"Updating model with {len(X)} new records")
+    for _ in range(ONLINE_EPOCHS):
+        sgd.partial_fit(Xs, y, classes=CLASSES)
+    state["n_seen"] += len(X)
+    state["watermark"] = new_watermark
+
+    # Last cancellation point: from here on the version is written and activated
+    progress(0.8, "Saving model version")
+    version, version_dir = new_version_dir(MODEL_DIR)
+
+    model = to_logistic_regression(scaler, sgd, X.columns)
+    model._version = version
+    model._trained_at = datetime.utcnow().isoformat()
+    model._base_version = base_version
+    model_path = os.path.join(version_dir, "logistic_model.joblib")
+    joblib.dump(model, model_path)
+    export_linear_model(model, version_dir)
+    joblib.dump(state, os.path.join(version_dir, ONLINE_STATE_FILE))
+
+    # Drift baseline: previous histograms plus the new rows, on the same edges
+    baseline = load_baseline(active_version_dir(base_version)) if extend_baseline else None
+    if baseline is not None and baseline["features"] == list(X.columns):
+        baseline = {**baseline, "counts": baseline["counts"] + bin_counts(baseline, X)}
+    else:
+        baseline = fit_baseline(X)
+    save_baseline(baseline, version_dir)
+
+    log_metrics(version, metrics)
+    register_version(version, {"logistic_model.joblib": file_sha256(model_path)})
+    try:
+        warm_predictions(model, version)
+    except Exception as e:
+        print(f"Prediction cache not filled for version {version}: {e}")
+    print(f"Incremental update {base_version} -> {version} on {len(X)} rows (watermark id {new_watermark['id']})")
+    return version
+
+
+if __name__ == "__main__":
+    import sys
+    if "--seed" in sys.argv:
+        seed_online_model()
+    else:
+        retrain_incremental()
@@ -0,0 +1,347 @@
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import text
+from data.db import get_engine
+from predict.model_loader import get_active_version
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+
+# Concurrent background jobs; the fits inside a retrain already fan out over processes
+JOB_WORKERS = int(os.getenv("RETRAIN_WORKERS", 1))
+# Finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 100
+
+# Job state shared by every web worker, so any of them can report or cancel a job
+JOBS_DB_PATH = os.path.join(MODEL_DIR, "jobs.db")
+JOBS_DB_URI = os.getenv("JOBS_DATABASE_URL", f"sqlite:///{JOBS_DB_PATH}")
+# Held while checking for an active job and queueing a new one
+JOBS_LOCK_PATH = os.getenv("JOBS_LOCK_PATH", f"{JOBS_DB_PATH}.lock")
+
+ACTIVE_STATES = ("queued", "running")
+
+JOB_COLUMNS = [
+    "id", "kind", "fingerprint", "status", "progress", "message", "result", "error",
+    "created_at", "finished_at", "owner",
+]
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _init_store(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS jobs(
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                fingerprint TEXT,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                finished_at TEXT
+            )
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs(kind, status)"))
+
+def _store():
+    """Engine for the job store, creating the table once"""
+    uri = JOBS_DB_URI
+    engine = get_engine(uri)
+    if uri not in _initialized:
+        with _init_lock:
+            if uri not in _initialized:
+                _init_store(engine)
+                _initialized.add(uri)
+    return engine
+
+@contextmanager
+def _jobs_lock():
+    """Exclusive lock for the active-job check and insert, across processes"""
+    os.makedirs(os.path.dirname(os.path.abspath(JOBS_LOCK_PATH)), exist_ok=True)
+    with open(JOBS_LOCK_PATH, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _now():
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+def _current_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _owner_alive(owner):
+    """False only for a job owned by a process on this host that no longer exists"""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+def _fetch_row(conn, job_id):
+    """Job row by id; an active job whose worker died is marked failed on the way"""
+    row = conn.execute(
+        text(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = :id"), {"id": job_id}
+    ).mappings().first()
+    if row is None or row["status"] not in ACTIVE_STATES or _owner_alive(row["owner"]):
+        return row
+    conn.execute(text("""
+        UPDATE jobs SET status = 'failed', message = 'Failed', error = 'Worker exited', finished_at = :now
+        WHERE id = :id
+    """), {"id": job_id, "now": _now()})
+    return dict(row, status="failed", message="Failed", error="Worker exited")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress checkpoint after cancel() was requested"""
+
+
+class Job:
+    def __init__(self, kind, fingerprint=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fingerprint = fingerprint
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @classmethod
+    def from_row(cls, row):
+        """Job read back from the store (run by this or another worker)"""
+        job = cls(row["kind"], row["fingerprint"])
+        job.update(row)
+        return job
+
+    def update(self, row):
+        for name in JOB_COLUMNS:
+            if name != "owner":
+                setattr(self, name, row[name])
+
+    @property
+    def done(self):
+        return self.status not in ACTIVE_STATES
+
+    def report(self, progress, message):
+        """Progress callback handed to the job function; also the cancellation checkpoint.
+
+        The cancel flag lives in the store, so a cancel sent to any worker stops the job.
+        """
+        progress = round(float(progress), 3)
+        if not self._cancel.is_set():
+            with _store().begin() as conn:
+                updated = conn.execute(text("""
+                    UPDATE jobs SET progress = :progress, message = :message
+                    WHERE id = :id AND cancel_requested = 0
+                """), {"id": self.id, "progress": progress, "message": message}).rowcount
+            if not updated:
+                self._cancel.set()
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.progress = progress
+        self.message = message
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """Background job queue on a thread pool, with job state in a shared store.
+
+    At most one queued or running job exists per (kind, fingerprint) across
+    all processes using the store: submitting the same dataset again returns
+    the job already in flight, whichever worker runs it.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, fingerprint=None, **kwargs):
+        """Queue fn(*args, progress=job.report, **kwargs) and return its Job"""
+        with self._lock, _jobs_lock():
+            with _store().begin() as conn:
+                active = conn.execute(text("""
+                    SELECT id FROM jobs
+                    WHERE kind = :kind AND fingerprint IS :fingerprint AND status IN ('queued', 'running')
+                """), {"kind": kind, "fingerprint": fingerprint}).scalars().all()
+                for job_id in active:
+                    row = _fetch_row(conn, job_id)
+                    if row["status"] in ACTIVE_STATES:
+                        return self._jobs.get(job_id) or Job.from_row(row)
+
+                job = Job(kind, fingerprint)
+                conn.execute(text("""
+                    INSERT INTO jobs (id, kind, fingerprint, status, progress, message, owner, created_at)
+                    VALUES (:id, :kind, :fingerprint, :status, :progress, :message, :owner, :created_at)
+                """), {
+                    "id": job.id, "kind": kind, "fingerprint": fingerprint, "status": job.status,
+                    "progress": job.progress, "message": job.message, "owner": _current_owner(),
+                    "created_at": job.created_at,
+                })
+
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            return job
+
+    def _run(self, job, fn, args, kwargs):
+        with _store().begin() as conn:
+            started = conn.execute(text("""
+                UPDATE jobs SET status = 'running', message = 'Running'
+                WHERE id = :id AND status = 'queued' AND cancel_requested = 0
+            """), {"id": job.id}).rowcount
+        if job._cancel.is_set() or not started:
+            return self._finish(job, "cancelled", "Cancelled")
+        job.status = "running"
+        job.message = "Running"
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+        except JobCancelled:
+            return self._finish(job, "cancelled", "Cancelled")
+        except Exception as e:
+            job.error = str(e)
+            print(f"Job {job.id} ({job.kind}) failed:", e)
+            return self._finish(job, "failed", "Failed")
+        job.progress = 1.0
+        self._finish(job, "succeeded", "Done")
+
+    def _finish(self, job, status, message):
+        job.status = status
+        job.message = message
+        job.finished_at = _now()
+        with _store().begin() as conn:
+            conn.execute(text("""
+                UPDATE jobs SET status = :status, message = :message, progress = :progress,
+                    result = :result, error = :error, finished_at = :finished_at
+                WHERE id = :id
+            """), {
+                "id": job.id, "status": status, "message": message, "progress": job.progress,
+                "result": None if job.result is None else str(job.result), "error": job.error,
+                "finished_at": job.finished_at,
+            })
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+        with _store().begin() as conn:
+            conn.execute(text("""
+                DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND id NOT IN (
+                    SELECT id FROM jobs WHERE status NOT IN ('queued', 'running')
+                    ORDER BY created_at DESC, rowid DESC LIMIT :keep
+                )
+            """), {"keep": MAX_FINISHED_JOBS})
+
+    def get(self, job_id):
+        """Current state of a job submitted by any worker, or None if unknown"""
+        with _store().begin() as conn:
+            row = _fetch_row(conn, job_id)
+        job = self._jobs.get(job_id)
+        if row is None:
+            return job
+        if job is None:
+            return Job.from_row(row)
+        # A queued job this runner owns may have been cancelled through another worker
+        if row["status"] not in ACTIVE_STATES and not job.done:
+            job.update(row)
+        return job
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running ones stop at their next checkpoint"""
+        with _store().begin() as conn:
+            conn.execute(text("""
+                UPDATE jobs SET cancel_requested = 1 WHERE id = :id AND status IN ('queued', 'running')
+            """), {"id": job_id})
+            conn.execute(text("""
+                UPDATE jobs SET status = 'cancelled', message = 'Cancelled', finished_at = :now
+                WHERE id = :id AND status = 'queued'
+            """), {"id": job_id, "now": _now()})
+
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done:
+            job._cancel.set()
+            if job.future is not None and job.future.cancel():
+                self._finish(job, "cancelled", "Cancelled")
+        return self.get(job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Process-wide JobRunner, created on first use"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
+
+def reset_runner():
+    """Forget the runner without shutting it down; used in a forked worker,
+    where the parent's executor threads do not exist"""
+    global _runner
+    _runner = None
+
+def submit_retrain(df):
+    """Retrain on df in the background; a retrain of the same dataset already in flight is reused"""
+    # Training modules pull in sklearn; imported on the first retrain, not at web app startup
+    from model.retrain import retrain_model
+    from model.save_best_model import dataset_fingerprint
+    return get_runner().submit("retrain", retrain_model, df, fingerprint=dataset_fingerprint(df))
+
+def submit_incremental_retrain():
+    """Update the active model with new records in the background, one update per base version"""
+    from model.incremental import retrain_incremental
+    return get_runner().submit("retrain_incremental", retrain_incremental, fingerprint=get_active_version())
+
+def get_job(job_id):
+    return get_runner().get(job_id) if job_id else None
+
+def cancel_job(job_id):
+    return get_runner().cancel(job_id)
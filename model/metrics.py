@@ -1,39 +1,237 @@
 import os
 import json
+import threading
+from collections import namedtuple
 from datetime import datetime
+from sqlalchemy import text
+from data.db import get_engine
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 MODEL_DIR = os.path.join(BASE_DIR, "model")
+# Legacy read-modify-write registry, imported into the store on first use
 METRICS_PATH = os.path.join(MODEL_DIR, "metrics.json")
 
+# Append-only metrics store: one snapshot row per log call, one value row per metric
+METRICS_DB_PATH = os.path.join(MODEL_DIR, "metrics.db")
+METRICS_DB_URI = os.getenv("METRICS_DATABASE_URL", f"sqlite:///{METRICS_DB_PATH}")
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+# Materialized view behind the admin pages, extended with each newly logged snapshot.
+# rows: wide table (one dict per snapshot, every metric key backfilled with 0.0)
+# latest: version -> latest row; max_psi_by_version: version -> max PSI_* seen
+MetricsView = namedtuple("MetricsView", [
+    "last_snapshot_id", "rows", "metric_options", "latest", "max_psi_by_version",
+    "psi_values", "max_psi",
+])
+EMPTY_VIEW = MetricsView(0, [], [], {}, {}, {}, 0)
+
+_view_cache = {}
+_view_lock = threading.Lock()
+
+
+def _init_store(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS metric_snapshots(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS metric_values(
+                snapshot_id INTEGER NOT NULL REFERENCES metric_snapshots(id),
+                metric TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (snapshot_id, metric)
+            )
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_metric_snapshots_version_ts "
+            "ON metric_snapshots(version, timestamp)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_metric_snapshots_ts ON metric_snapshots(timestamp)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_metric_values_metric ON metric_values(metric, snapshot_id)"
+        ))
+
+        empty = conn.execute(text("SELECT 1 FROM metric_snapshots LIMIT 1")).first() is None
+        if empty and os.path.exists(METRICS_PATH):
+            with open(METRICS_PATH) as f:
+                legacy = json.load(f)
+            for version, snapshots in legacy.items():
+                for snap in snapshots:
+                    snap = dict(snap)
+                    _insert_snapshot(conn, version, snap.pop("timestamp"), snap)
+            print(f"Imported legacy metrics from {METRICS_PATH}")
+
+def _store():
+    """Engine for the metrics store, creating tables (and importing metrics.json) once"""
+    engine = get_engine(METRICS_DB_URI)
+    if METRICS_DB_URI not in _initialized:
+        with _init_lock:
+            if METRICS_DB_URI not in _initialized:
+                _init_store(engine)
+                _initialized.add(METRICS_DB_URI)
+    return engine
+
+def _insert_snapshot(conn, version, timestamp, metrics_dict):
+    snapshot_id = conn.execute(
+        text("INSERT INTO metric_snapshots (version, timestamp) VALUES (:version, :timestamp)"),
+        {"version": str(version), "timestamp": timestamp},
+    ).lastrowid
+    if metrics_dict:
+        conn.execute(
+            text("INSERT INTO metric_values (snapshot_id, metric, value) VALUES (:sid, :metric, :value)"),
+            [
+                {"sid": snapshot_id, "metric": k, "value": None if v is None else float(v)}
+                for k, v in metrics_dict.items()
+            ],
+        )
+    return snapshot_id
+
 def log_metrics(version, metrics_dict):
     """Log model metrics for a given version and timestamp"""
-    snapshot = {
-        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
-        **metrics_dict
-    }
+    timestamp = datetime.utcnow().isoformat(timespec="seconds")
+
+    # One small transaction per snapshot, independent of history size
+    with _store().begin() as conn:
+        _insert_snapshot(conn, version, timestamp, metrics_dict)
+
+    print(f"Metrics logged for model version {version} at {timestamp}")
 
-    if os.path.exists(METRICS_PATH):
-        with open(METRICS_PATH, "r") as f:
-            metrics_registry = json.load(f)
-    else:
-        metrics_registry = {}
+def _fetch_snapshots(version=None, start=None, end=None, metrics=None, after_id=None):
+    """Return [(snapshot_id, snapshot), ...] ordered by log time"""
+    clauses, params = [], {}
+    if version is not None:
+        clauses.append("s.version = :version")
+        params["version"] = str(version)
+    if start is not None:
+        clauses.append("s.timestamp >= :start")
+        params["start"] = start
+    if end is not None:
+        clauses.append("s.timestamp <= :end")
+        params["end"] = end
+    if after_id is not None:
+        clauses.append("s.id > :after_id")
+        params["after_id"] = int(after_id)
+    if metrics is not None:
+        metrics = list(metrics)
+        names = ", ".join(f":m{i}" for i in range(len(metrics))) or "NULL"
+        clauses.append(f"v.metric IN ({names})")
+        params.update({f"m{i}": m for i, m in enumerate(metrics)})
 
-    metrics_registry.setdefault(version, []).append(snapshot)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = text(f"""
+        SELECT s.id, s.version, s.timestamp, v.metric, v.value
+        FROM metric_snapshots s
+        LEFT JOIN metric_values v ON v.snapshot_id = s.id
+        {where}
+        ORDER BY s.id, v.rowid
+    """)
 
-    with open(METRICS_PATH, "w") as f:
-        json.dump(metrics_registry, f, indent=4)
-    
-    print(f"Metrics logged for model version {version} at {snapshot['timestamp']}")
+    snapshots = {}
+    with _store().connect() as conn:
+        for snapshot_id, snap_version, timestamp, metric, value in conn.execute(sql, params):
+            snap = snapshots.setdefault(snapshot_id, {"version": snap_version, "timestamp": timestamp})
+            if metric is not None:
+                snap[metric] = value
+    return list(snapshots.items())
+
+def query_metrics(version=None, start=None, end=None, metrics=None):
+    """Return snapshots ordered by log time, filtered by version, ISO time range and metric names.
+
+    Each snapshot is {"version", "timestamp", <metric>: value, ...}; with
+    `metrics` only those metric keys are included.
+    """
+    return [snap for _, snap in _fetch_snapshots(version, start, end, metrics)]
 
 def load_metrics(version=None):
     """Load metrics for a specific version, or all versions"""
-    if not os.path.exists(METRICS_PATH):
-        return {}
-    
-    with open(METRICS_PATH, "r") as f:
-        metrics_registry = json.load(f)
-    
+    metrics_registry = {}
+    for snap in query_metrics(version=version):
+        snap_version = snap.pop("version")
+        metrics_registry.setdefault(snap_version, []).append(snap)
+
     if version:
         return metrics_registry.get(version, {})
-    return metrics_registry
\ No newline at end of file
+    return metrics_registry
+
+
+def extend_metrics_view(view, snapshots):
+    """Fold new (snapshot_id, snapshot) pairs into a MetricsView, touching only the new rows.
+
+    Earlier rows are rebuilt only when a metric key appears for the first time
+    and has to be backfilled.
+    """
+    if not snapshots:
+        return view
+
+    keys = list(view.rows[0]) if view.rows else ["version", "timestamp"]
+    new_keys = []
+    for _, snap in snapshots:
+        new_keys.extend(k for k in snap if k not in keys and k not in new_keys)
+
+    rows = list(view.rows)
+    latest = dict(view.latest)
+    if new_keys and rows:
+        rows = [{**row, **dict.fromkeys(new_keys, 0.0)} for row in rows]
+        latest = {row["version"]: row for row in rows}
+    keys += new_keys
+
+    max_psi_by_version = dict(view.max_psi_by_version)
+    for _, snap in snapshots:
+        row = {k: snap.get(k, 0.0) for k in keys}
+        rows.append(row)
+        version = row["version"]
+        latest[version] = row
+
+        psi = [v for k, v in snap.items() if k.startswith("PSI_") and v is not None]
+        max_psi_by_version[version] = max([max_psi_by_version.get(version, 0), *psi])
+
+    # Drift panel: latest snapshot of the most recently introduced version
+    newest = latest[list(latest)[-1]]
+    psi_values = {k: newest[k] for k in sorted(keys) if k.startswith("PSI_")}
+
+    return MetricsView(
+        last_snapshot_id=snapshots[-1][0],
+        rows=rows,
+        metric_options=sorted(k for k in keys if k not in ("timestamp", "version")),
+        latest=latest,
+        max_psi_by_version=max_psi_by_version,
+        psi_values=psi_values,
+        max_psi=max(max_psi_by_version.values(), default=0),
+    )
+
+def build_metrics_view(metrics_registry):
+    """Build a MetricsView from a {version: [snapshot, ...]} registry"""
+    snapshots = [
+        (0, {"version": version, **snap})
+        for version, snaps in metrics_registry.items()
+        for snap in snaps
+    ]
+    return extend_metrics_view(EMPTY_VIEW, snapshots)
+
+def load_metrics_view():
+    """Return the materialized MetricsView, reading only snapshots logged since the last call"""
+    engine = _store()
+    with engine.connect() as conn:
+        last_id = conn.execute(text("SELECT MAX(id) FROM metric_snapshots")).scalar() or 0
+
+    view = _view_cache.get(METRICS_DB_URI, EMPTY_VIEW)
+    if view.last_snapshot_id == last_id:
+        return view
+
+    with _view_lock:
+        view = _view_cache.get(METRICS_DB_URI, EMPTY_VIEW)
+        if last_id < view.last_snapshot_id:
+            # The store was recreated or truncated: the view no longer matches it
+            view = EMPTY_VIEW
+        if view.last_snapshot_id != last_id:
+            view = extend_metrics_view(view, _fetch_snapshots(after_id=view.last_snapshot_id))
+            _view_cache[METRICS_DB_URI] = view
+        return view
@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+REGISTRY_PATH = os.path.join(MODEL_DIR, "registry.json")
+
+_thread_lock = threading.RLock()
+
+
+def change_token(path=None):
+    """Cheap marker that changes with every registry write: (path, inode, mtime_ns, size).
+
+    Writes replace the file by rename, so the inode changes even when two
+    writes land within the filesystem's timestamp resolution.
+    """
+    path = path or REGISTRY_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None, None)
+    return (path, st.st_ino, st.st_mtime_ns, st.st_size)
+
+@contextmanager
+def registry_lock(path=None):
+    """Exclusive lock for a registry read-modify-write, across threads and processes"""
+    path = path or REGISTRY_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _thread_lock:
+        with open(f"{path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def read_registry(path=None):
+    """Registry contents, or {} when it is missing or unreadable"""
+    path = path or REGISTRY_PATH
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, registry):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def update_registry(update, path=None):
+    """Apply update(registry) under the lock and write the result atomically.
+
+    If update returns False the file is left untouched (no token change).
+    """
+    path = path or REGISTRY_PATH
+    with registry_lock(path):
+        registry = read_registry(path)
+        if update(registry) is False:
+            return registry
+        registry["revision"] = registry.get("revision", 0) + 1
+        registry["last_updated"] = datetime.utcnow().isoformat()
+        _write_atomic(path, registry)
+        return registry
+
+def register_version(version, artifacts=None, activate=True, path=None):
+    """Record a version (with {file name: sha256} of its artifacts) and optionally activate it"""
+    def update(registry):
+        versions = registry.setdefault("versions", [])
+        known = registry.setdefault("artifacts", {})
+        changed = version not in versions
+        if changed:
+            versions.append(version)
+        if artifacts and known.get(version) != artifacts:
+            known[version] = artifacts
+            changed = True
+        if activate and registry.get("active") != version:
+            registry["active"] = version
+            changed = True
+        return changed
+
+    return update_registry(update, path)
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def install_artifact(src, dest):
+    """Copy src to dest unless dest already has the same content; returns (sha256, copied)"""
+    digest = file_sha256(src)
+    if os.path.exists(dest) and file_sha256(dest) == digest:
+        return digest, False
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{uuid.uuid4().hex[:8]}.tmp"
+    shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dest)
+    return digest, True
+
+def new_version_dir(model_dir=None):
+    """Create and return (version, path) of a fresh version folder.
+
+    Ids stay time-sortable; the random suffix and exclusive mkdir keep
+    concurrent trainers from ever sharing a folder.
+    """
+    model_dir = model_dir or MODEL_DIR
+    while True:
+        version = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(model_dir, version)
+        try:
+            os.makedirs(path)
+            return version, path
+        except FileExistsError:
+            continue
@@ -1,21 +1,55 @@
 import os
 import json
 import joblib
+import numpy as np
 from datetime import datetime
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, roc_auc_score
-from model.drift import population_stability_index
+from sklearn.metrics import roc_auc_score
+from model.drift import fit_baseline, feature_psi, save_baseline
 from model.metrics import log_metrics
-
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+from model.save_best_model import CV_FOLDS, LINEAR_CANDIDATES, search_candidates, fit_best
+from model.evaluation import split_dataset, bootstrap_metrics, save_evaluation
+from model import registry as registry_module
+from predict.linear_model import export_linear_model
+from predict.prediction_store import prune_predictions, warm_predictions
+from etl.transform.transform import METADATA_COLS
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 MODEL_DIR = os.path.join(BASE_DIR, "model")
 REGISTRY_PATH = os.path.join(MODEL_DIR, "registry.json")
+# Search worker processes for retrains (joblib convention: -1 = all cores)
+RETRAIN_N_JOBS = int(os.getenv("RETRAIN_N_JOBS", -1))
+
+def register_version(version, artifacts=None):
+    """Add version to registry.json and make it the active model"""
+    registry = registry_module.register_version(version, artifacts=artifacts, path=REGISTRY_PATH)
+    print(f"Registry path: {REGISTRY_PATH}")
+    print("Registry contents after retrain:", json.dumps(registry, indent=4))
+
+    # Cached predictions of the retired versions are never read again
+    try:
+        prune_predictions([registry["active"]])
+    except Exception as e:
+        print(f"Prediction cache not pruned: {e}")
+    return registry
+
+def _no_progress(fraction, message):
+    pass
+
+def retrain_model(df, progress=_no_progress):
+    """Retrain model on current data and save as a new version.
+
+    `progress(fraction, message)` is called between steps; a background job
+    uses it for status and raises there to cancel before anything is written.
+    """
+    progress(0.0, "Preparing training data")
 
-def retrain_model(df):
-    """Retrain model on current data and save as a new version."""
-    
     TARGET_COL = "Visual"
-    FEATURE_COLS = [c for c in df.columns if c != TARGET_COL and c != "patient_id"]
+    FEATURE_COLS = [
+        c for c in df.columns
+        if c != TARGET_COL and c != "patient_id" and c not in METADATA_COLS
+    ]
 
     X = df[FEATURE_COLS]
     y = df[TARGET_COL]
@@ -29,20 +63,40 @@ def retrain_model(df):
         print("No valid training data available! Skipping retrain.")
         return None
 
-    # Train model
-    model = LogisticRegression(max_iter=1000)
-    model.fit(X, y)
+    # Deterministic split, cached per dataset fingerprint
+    split = split_dataset(X, y)
+    X_train, y_train = X.iloc[split.train], y.iloc[split.train]
+
+    progress(0.1, "Training candidates")
+    # Train model: parallel candidate search when every class can fill the CV folds
+    if y_train.value_counts().min() >= CV_FOLDS:
+        # Only deployable (linear) candidates, on a capped number of workers
+        leaderboard = search_candidates(X_train, y_train, candidates=LINEAR_CANDIDATES, n_jobs=RETRAIN_N_JOBS)
+        model = fit_best(X_train, y_train, leaderboard)
+        print(leaderboard.head().to_string(index=False))
+    else:
+        model = LogisticRegression(max_iter=1000)
+        model.fit(X_train, y_train)
+
+    progress(0.6, "Evaluating model")
+    validation_metrics = {}
+    if split.held_out:
+        X_val, y_val = X.iloc[split.validation], y.iloc[split.validation]
+        if y_val.nunique() == 2:
+            validation_metrics["Validation_AUC"] = round(roc_auc_score(y_val, model.predict_proba(X_val)[:, 1]), 4)
+
+        # Final fit on train + validation; the test rows stay unseen
+        fit_rows = np.sort(np.concatenate([split.train, split.validation]))
+        model = clone(model).fit(X.iloc[fit_rows], y.iloc[fit_rows])
 
-    y_pred = model.predict(X)
-    y_proba = model.predict_proba(X)[:, 1]
+    X_test, y_test = X.iloc[split.test], y.iloc[split.test]
+    evaluation = bootstrap_metrics(y_test, model.predict(X_test), model.predict_proba(X_test)[:, 1])
 
-    accuracy = accuracy_score(y, y_pred)
-    auc = roc_auc_score(y, y_proba)
+    # Last cancellation point: from here on the version is written and activated
+    progress(0.8, "Saving model version")
 
-    # Create new version folder
-    version = datetime.now().strftime("%Y%m%d%H%M%S")
-    version_dir = os.path.join(MODEL_DIR, version)
-    os.makedirs(version_dir, exist_ok=True)
+    # Create new version folder (collision-free id)
+    version, version_dir = registry_module.new_version_dir(MODEL_DIR)
 
     # Attach metadata
     model._version = version
@@ -52,47 +106,32 @@ def retrain_model(df):
     #Save Model
     model_path = os.path.join(version_dir, "logistic_model.joblib")
     joblib.dump(model, model_path)
+    # Coefficient bundle served by the loader without sklearn
+    export_linear_model(model, version_dir)
 
-    # Drift (PSI) Calculation
-    baseline = X.iloc[: len(X)//2]
-    current = X.iloc[len(X)//2 :]
+    # Drift (PSI) Calculation: second half binned on the first half's edges
+    psi_scores = feature_psi(fit_baseline(X.iloc[: len(X)//2]), X.iloc[len(X)//2 :])
 
-    psi_scores = {
-        f"PSI_{col}": population_stability_index(
-            baseline[col],
-            current[col]
-        )
-        for col in X.columns
-    }
+    # Freeze training histograms so scoring runs only bin the current data
+    save_baseline(fit_baseline(X), version_dir)
+
+    # Reused by later evaluations of this version on the same data
+    save_evaluation(version_dir, split.fingerprint, evaluation)
 
     metrics = {
-        "Accuracy": round(accuracy, 4),
-        "AUC": round(auc, 4),
+        **{k: round(v, 4) for k, v in evaluation.items()},
+        **validation_metrics,
         **psi_scores
     }
 
     log_metrics(version, metrics)
 
+    # Swap the active version (loaders pick it up through the registry stat check)
+    register_version(version, {"logistic_model.joblib": registry_module.file_sha256(model_path)})
 
-    # Update registry.json
-    if os.path.exists(REGISTRY_PATH):
-        with open(REGISTRY_PATH) as f:
-            registry = json.load(f)
-    else:
-        registry = {}
-
-    registry.setdefault("versions", [])
-
-    if version not in registry["versions"]:
-        registry["versions"].append(version)
-
-    registry["active"] = version
-    registry["last_updated"] = datetime.utcnow().isoformat()
-
-    with open(REGISTRY_PATH, "w") as f:
-        json.dump(registry, f, indent=4)
-
-    print(f"Registry path: {REGISTRY_PATH}")
-    print("Registry contents after retrain:", json.dumps(registry, indent=4))
-    print(f"Model retrained and activated: {version}")
-    return model
\ No newline at end of file
+    # Pre-score the training records so reads under the new version are lookups
+    try:
+        warm_predictions(model, version, df.loc[valid_idx])
+    except Exception as e:
+        print(f"Prediction cache not filled for version {version}: {e}")
+    return version
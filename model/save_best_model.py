@@ -1,11 +1,132 @@
 import pandas as pd
+import numpy as np
+import hashlib
+import threading
+from collections import OrderedDict
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
 import joblib
 import os
 
-def train_and_save_model():
-    """Train logistic regression and save .pkl model"""
+# Worker processes for the search (joblib convention: -1 = all cores)
+TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", -1))
+CV_FOLDS = 5
+# Datasets whose fold indices are kept (least recently used dropped first)
+FOLD_CACHE_SIZE = int(os.getenv("FOLD_CACHE_SIZE", 4))
+
+# Each candidate is fitted along a path of one parameter, warm-starting every
+# step from the previous fit (strongest regularization / fewest trees first).
+# Only linear candidates can be deployed: the dashboard explains predictions
+# from coef_.
+CANDIDATES = {
+    "logistic": {
+        "estimator": LogisticRegression(max_iter=1000, warm_start=True),
+        "path": ("C", [0.01, 0.1, 1, 10, 100]),
+        "linear": True,
+    },
+    "logistic_balanced": {
+        "estimator": LogisticRegression(max_iter=1000, warm_start=True, class_weight="balanced"),
+        "path": ("C", [0.01, 0.1, 1, 10, 100]),
+        "linear": True,
+    },
+    "random_forest": {
+        "estimator": RandomForestClassifier(random_state=42, warm_start=True, n_jobs=1),
+        "path": ("n_estimators", [50, 100, 200]),
+        "linear": False,
+    },
+}
+
+# Candidates the serving path can deploy
+LINEAR_CANDIDATES = [name for name, spec in CANDIDATES.items() if spec["linear"]]
+
+_fold_cache = OrderedDict()
+_fold_cache_lock = threading.Lock()
+
+
+def dataset_fingerprint(X, y=None):
+    """Content hash of a training set (values, columns and row order)"""
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(",".join(map(str, X.columns)).encode())
+    if y is not None:
+        h.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def cv_splits(X, y, cv=CV_FOLDS, fingerprint=None):
+    """Stratified fold indices, cached for the FOLD_CACHE_SIZE most recently used datasets"""
+    key = (fingerprint or dataset_fingerprint(X, y), cv)
+    with _fold_cache_lock:
+        splits = _fold_cache.get(key)
+        if splits is not None:
+            _fold_cache.move_to_end(key)
+            return splits
+
+    splits = list(StratifiedKFold(n_splits=cv).split(X, y))
+    with _fold_cache_lock:
+        _fold_cache[key] = splits
+        while len(_fold_cache) > FOLD_CACHE_SIZE:
+            _fold_cache.popitem(last=False)
+    return splits
+
+def _fit_path(name, fold, X, y, train_idx, test_idx):
+    """Fit one candidate along its path on one fold; returns [(name, fold, value, f1), ...]"""
+    spec = CANDIDATES[name]
+    param, values = spec["path"]
+    model = clone(spec["estimator"])
+    X_train, y_train = X.iloc[train_idx], y.iloc[train_idx]
+    X_test, y_test = X.iloc[test_idx], y.iloc[test_idx]
+
+    scores = []
+    for value in values:
+        model.set_params(**{param: value})
+        model.fit(X_train, y_train)
+        scores.append((name, fold, value, f1_score(y_test, model.predict(X_test))))
+    return scores
+
+def search_candidates(X, y, candidates=None, n_jobs=TRAIN_N_JOBS, cv=CV_FOLDS):
+    """Cross-validate every candidate path, one (candidate, fold) task per worker.
+
+    Returns a leaderboard DataFrame sorted by mean F1 (best first). Fold
+    indices come from cv_splits, so searching the same dataset again reuses them.
+    """
+    candidates = list(candidates or CANDIDATES)
+    splits = cv_splits(X, y, cv)
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_path)(name, fold, X, y, train_idx, test_idx)
+        for name in candidates
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+
+    scores = pd.DataFrame(
+        [row for fold_scores in results for row in fold_scores],
+        columns=["candidate", "fold", "value", "f1"],
+    )
+    leaderboard = (
+        scores.groupby(["candidate", "value"], sort=False)["f1"]
+        .agg(mean_f1="mean", std_f1="std")
+        .reset_index()
+    )
+    leaderboard.insert(1, "param", leaderboard["candidate"].map(lambda c: CANDIDATES[c]["path"][0]))
+    leaderboard["linear"] = leaderboard["candidate"].map(lambda c: CANDIDATES[c]["linear"])
+    return leaderboard.sort_values("mean_f1", ascending=False, kind="stable").reset_index(drop=True)
+
+def fit_best(X, y, leaderboard):
+    """Refit the best deployable (linear) leaderboard entry on X, y"""
+    best = leaderboard[leaderboard["linear"]].iloc[0]
+    spec = CANDIDATES[best["candidate"]]
+    # Leaderboard values share one numeric column; take the original path value
+    value = next(v for v in spec["path"][1] if v == best["value"])
+    model = clone(spec["estimator"])
+    model.set_params(warm_start=False, **{best["param"]: value})
+    return model.fit(X, y)
+
+def train_and_save_model(n_jobs=TRAIN_N_JOBS):
+    """Search the candidates, save the best linear model as .pkl and return the leaderboard"""
     # Load cleaned data
     df = pd.read_csv("data/migraine_symptom_classification_clean.csv")
 
@@ -15,20 +136,19 @@ def train_and_save_model():
     # Train/Test Split
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    # Logistic Regression with hyperparameter tuning
-    param_grid_lr = {'C': [0.01, 0.1, 1, 10, 100]}
-    log_reg = LogisticRegression(max_iter=1000)
-    grid_lr = GridSearchCV(log_reg, param_grid_lr, cv=5, scoring='f1')
-    grid_lr.fit(X_train, y_train)
+    # Cross-validated search over all candidates, folds spread over worker processes
+    leaderboard = search_candidates(X_train, y_train, n_jobs=n_jobs)
+    print(leaderboard.to_string(index=False))
 
     # Get best model
-    best_lr = grid_lr.best_estimator_
+    best_lr = fit_best(X_train, y_train, leaderboard)
 
     # Save model
     os.makedirs("model", exist_ok=True)
     joblib.dump(best_lr, os.path.join("model", "logistic_model.pkl"))
     print("Best Logistic Regression Model Saved to: model/logistic_model.pkl")
+    return leaderboard
 
 
 if __name__ == "__main__":
-    train_and_save_model()
\ No newline at end of file
+    train_and_save_model()
@@ -1,14 +1,18 @@
 import os
-import json
-import shutil
-from .save_best_model import train_and_save_model  # relative import
+from predict.linear_model import LINEAR_EXPORT_FILE, export_linear_model
+from .registry import install_artifact, read_registry, register_version
 
-def ensure_model(version="v1"):
+def ensure_model(version="v1", model_dir=None):
     """
     Train model if needed, ensure legacy + versioned folder exist, and update registry.
+
+    Copies and the registry write are skipped when nothing changed, so
+    restarts leave the files (and the loaders' change token) alone, and
+    sklearn/joblib are only imported when a model has to be trained or exported.
+    `model_dir` defaults to this package's folder.
     """
 
-    BASE_DIR = os.path.dirname(__file__)
+    BASE_DIR = model_dir or os.path.dirname(__file__)
     MODEL_PKL = os.path.join(BASE_DIR, "logistic_model.pkl")
     VERSION_FOLDER = os.path.join(BASE_DIR, version)
     VERSION_MODEL = os.path.join(VERSION_FOLDER, "logistic_model.joblib")
@@ -19,38 +23,45 @@ def ensure_model(version="v1"):
     # Step 1: Train model if missing
     if not os.path.exists(MODEL_PKL):
         print("No trained model found. Training now...")
+        # sklearn is only imported when there is something to train
+        from .save_best_model import train_and_save_model  # relative import
         train_and_save_model()
 
-    # Step 2: Create folders if missing
-    os.makedirs(VERSION_FOLDER, exist_ok=True)
-    os.makedirs(LEGACY_FOLDER, exist_ok=True)
-
-    # Step 3: Copy model to version folder
-    shutil.copy2(MODEL_PKL, VERSION_MODEL)
+    # Step 2 + 3: Copy model to version folder (only if its content differs)
+    digest, copied = install_artifact(MODEL_PKL, VERSION_MODEL)
+    if copied:
+        # Cached predictions are keyed by version name; those of the replaced file are stale
+        from predict.prediction_store import forget_predictions
+        forget_predictions(version)
 
     # Step 4: Ensure legacy model exists
-    if not os.path.exists(LEGACY_MODEL):
-        shutil.copy2(MODEL_PKL, LEGACY_MODEL)
+    legacy_created = not os.path.exists(LEGACY_MODEL)
+    if legacy_created:
+        install_artifact(MODEL_PKL, LEGACY_MODEL)
         print("Legacy model created.")
 
-    # Step 5: Update registry
-    registry = {"active": version}
-    if os.path.exists(REGISTRY_PATH):
-        try:
-            with open(REGISTRY_PATH, "r") as f:
-                data = json.load(f)
-            data["active"] = version
-            registry = data
-        except Exception:
-            pass  # fallback to default registry
-    with open(REGISTRY_PATH, "w") as f:
-        json.dump(registry, f, indent=2)
+    # Step 4b: NumPy serving exports, rebuilt only when the model changed or the export is missing
+    for folder, refresh in ((VERSION_FOLDER, copied), (LEGACY_FOLDER, legacy_created)):
+        if refresh or not os.path.exists(os.path.join(folder, LINEAR_EXPORT_FILE)):
+            import joblib
+            export_linear_model(joblib.load(os.path.join(folder, "logistic_model.joblib")), folder)
+
+    # Step 5: Update registry. A restart keeps a retrained active version;
+    # `version` is activated only when nothing usable is active.
+    registry = read_registry(REGISTRY_PATH)
+    active = registry.get("active")
+    activate = active is None or not os.path.exists(os.path.join(BASE_DIR, active, "logistic_model.joblib"))
+    artifacts = {"logistic_model.joblib": digest}
+    if not activate and registry.get("artifacts", {}).get(version) == artifacts and not copied:
+        print(f"Model '{version}' unchanged. Registry left as is (active={active}).")
+        return
 
-    print(f"Model '{version}' ensured. Registry updated → active={version}")
+    registry = register_version(version, artifacts=artifacts, activate=activate, path=REGISTRY_PATH)
+    print(f"Model '{version}' ensured. Registry updated → active={registry['active']}")
 
 
 # CLI support
 if __name__ == "__main__":
     import sys
     ver = sys.argv[1] if len(sys.argv) > 1 else "v1"
-    ensure_model(ver)
\ No newline at end of file
+    ensure_model(ver)
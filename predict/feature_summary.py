@@ -1,26 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 
+# Global summaries of the most recently used models (retired versions drop out)
+SUMMARY_CACHE_SIZE = 4
+
+# Keyed by a digest of feature names + coefficients, so any model with the same weights shares an entry
+_summary_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _summary_key(model):
+    digest = hashlib.sha1("\0".join(map(str, model.feature_names_in_)).encode())
+    digest.update(np.asarray(model.coef_[0], dtype="float64").tobytes())
+    return digest.hexdigest()
+
 def global_feature_summary(model):
-    """Returnd DataFrame of features including coefficients and odds-ratios"""
+    """Returns DataFrame of features including coefficients and odds-ratios (computed once per set of coefficients)"""
+
+    key = _summary_key(model)
+    with _cache_lock:
+        summary = _summary_cache.get(key)
+        if summary is not None:
+            _summary_cache.move_to_end(key)
+            return summary
 
     FEATURE_COLS = model.feature_names_in_
     coefs = model.coef_[0]
     odds_ratios = np.exp(coefs)
-    df = pd.DataFrame({
+    summary = pd.DataFrame({
         "Feature": FEATURE_COLS,
-        "Coeffiecient": coefs,
+        "Coefficient": coefs,
         "Odds_Ratio": odds_ratios
     }).sort_values(by="Odds_Ratio", ascending=False)
-    return df
 
-def patient_feature_contribution(model, X_patient):
-    """Returns DataFrame showning contribution of each feature"""
+    with _cache_lock:
+        _summary_cache[key] = summary
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return summary
 
-    FEATURE_COLS = model.feature_names_in_
-    log_odds = X_patient.iloc[0].values * model.coef_[0]
+def clear_summary_cache():
+    with _cache_lock:
+        _summary_cache.clear()
+
+def feature_contributions(model, X):
+    """Per-row log-odds contribution of every feature (X * coef), as an (n_rows, n_features) array"""
+    if hasattr(X, "columns"):
+        X = X[list(model.feature_names_in_)]
+    return np.asarray(X, dtype="float64") * np.asarray(model.coef_[0], dtype="float64")
+
+def top_contributors(contributions, k=5):
+    """Column indices and values of the k largest |contributions| per row, largest first"""
+    contributions = np.atleast_2d(contributions)
+    k = min(k, contributions.shape[1])
+    magnitude = np.abs(contributions)
+
+    # Unordered top k per row, then sort just those k columns
+    idx = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(magnitude, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(contributions, idx, axis=1)
+
+def cohort_contribution_summary(model, X, contributions=None):
+    """DataFrame of contribution statistics per feature across a cohort, by mean |contribution|"""
+    if contributions is None:
+        contributions = feature_contributions(model, X)
     df = pd.DataFrame({
-        "Feature": FEATURE_COLS,
-        "Contribution": log_odds
+        "Feature": model.feature_names_in_,
+        "Mean_Contribution": contributions.mean(axis=0),
+        "Mean_Abs_Contribution": np.abs(contributions).mean(axis=0),
+        "Std_Contribution": contributions.std(axis=0),
+        "Min_Contribution": contributions.min(axis=0),
+        "Max_Contribution": contributions.max(axis=0),
+        "Share_Positive": (contributions > 0).mean(axis=0),
+    }).sort_values(by="Mean_Abs_Contribution", ascending=False)
+    return df
+
+def contribution_frame(feature_names, contributions):
+    """DataFrame of one record's per-feature contributions, largest first"""
+    return pd.DataFrame({
+        "Feature": feature_names,
+        "Contribution": contributions
     }).sort_values(by="Contribution", ascending=False)
-    return df
\ No newline at end of file
+
+def patient_feature_contribution(model, X_patient):
+    """Returns DataFrame showing contribution of each feature"""
+    log_odds = feature_contributions(model, X_patient.iloc[:1])[0]
+    return contribution_frame(model.feature_names_in_, log_odds)
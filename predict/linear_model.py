@@ -0,0 +1,88 @@
+import os
+import numpy as np
+
+# Compact serving artifact of a linear model, written next to logistic_model.joblib
+LINEAR_EXPORT_FILE = "linear_model.npz"
+
+
+def _expit(x):
+    """Logistic function in NumPy, stable for large |x| (no overflow in exp)"""
+    e = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+class LinearScorer:
+    """Pure-NumPy stand-in for a fitted binary LogisticRegression.
+
+    Exposes the attributes and methods the dashboard and scoring code use
+    (feature_names_in_, classes_, coef_, intercept_, decision_function,
+    predict_proba, predict) without importing or unpickling sklearn.
+    """
+
+    def __init__(self, coef, intercept, classes, feature_names, version=None):
+        self.coef_ = np.asarray(coef, dtype="float64").reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype="float64").reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self._version = version
+
+    def _as_array(self, X):
+        if hasattr(X, "columns"):
+            missing = [c for c in self.feature_names_in_ if c not in X.columns]
+            if missing:
+                raise ValueError(f"Missing required features: {missing}")
+            X = X[list(self.feature_names_in_)]
+            # Common dtype of the columns (e.g. int64 for int + bool), as sklearn's validation picks
+            kinds = {dtype.kind for dtype in X.dtypes}
+            X = X.to_numpy(dtype=np.result_type(*X.dtypes) if kinds <= set("fiub") else "float64")
+        # Keep the input dtype and memory layout, as sklearn's validation does,
+        # so the matrix product runs the same BLAS path
+        X = np.asarray(X)
+        if X.dtype.kind not in "fiub":
+            X = X.astype("float64")
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        return X
+
+    def decision_function(self, X):
+        # Same operations and order as sklearn's LinearClassifierMixin
+        scores = self._as_array(X) @ self.coef_.T + self.intercept_
+        return scores.reshape(-1)
+
+    def predict_proba(self, X):
+        prob = _expit(self.decision_function(X))
+        return np.stack([1 - prob, prob], axis=1)
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def export_linear_model(model, version_dir):
+    """Write the coefficient bundle of a binary linear model; returns its path (None if not linear)"""
+    coef = getattr(model, "coef_", None)
+    if coef is None or np.shape(coef)[0] != 1 or not hasattr(model, "feature_names_in_"):
+        return None
+
+    path = os.path.join(version_dir, LINEAR_EXPORT_FILE)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        coef=np.asarray(coef, dtype="float64"),
+        intercept=np.asarray(model.intercept_, dtype="float64"),
+        classes=np.asarray(model.classes_),
+        feature_names=np.asarray(model.feature_names_in_, dtype=str),
+        version=np.asarray(str(getattr(model, "_version", ""))),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+def load_linear_model(path):
+    with np.load(path, allow_pickle=False) as data:
+        return LinearScorer(
+            data["coef"],
+            data["intercept"],
+            data["classes"],
+            data["feature_names"].tolist(),
+            version=str(data["version"]) or None,
+        )
@@ -1,23 +1,50 @@
-import json
 import joblib
 import os
+import threading
+from collections import namedtuple
+from model.registry import change_token, read_registry
+from predict.linear_model import LINEAR_EXPORT_FILE, load_linear_model
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 REGISTRY_PATH = os.path.join(BASE_DIR, "model", "registry.json")
+# "numpy" serves a version's linear_model.npz export when it has one; "sklearn" always unpickles
+MODEL_SERVING = os.getenv("MODEL_SERVING", "numpy")
 
+# One loaded model per process, swapped as a whole when the registry or model file changes
+CachedModel = namedtuple("CachedModel", ["registry_token", "version", "model_path", "model_stat", "model"])
 
-def get_active_version(default="legacy"):
-    if not os.path.exists(REGISTRY_PATH):
-        return default
+_model_cache = None
+_version_cache = (None, None)
+_cache_lock = threading.Lock()
+
+
+def _file_token(path):
+    """Cheap change marker for a file: (path, mtime_ns, size) from a single stat call"""
     try:
-        with open(REGISTRY_PATH) as f:
-            data = json.load(f)
-        return data.get("active", default)
-    except Exception:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def get_active_version(default="legacy"):
+    global _version_cache
+    token = change_token(REGISTRY_PATH)
+    if _version_cache[0] == token:
+        return _version_cache[1]
+
+    if token[1] is None:
         return default
+    # Registry writes are atomic renames, so a read never sees a partial file
+    version = read_registry(REGISTRY_PATH).get("active", default)
 
-def load_active_model():
-    version = get_active_version()
+    _version_cache = (token, version)
+    return version
+
+def version_dir(version):
+    return os.path.join(BASE_DIR, "model", version)
+
+def resolve_model_path(version):
     model_path = os.path.join(BASE_DIR, "model", version, "logistic_model.joblib")
 
     # fallback to legacy
@@ -29,4 +56,52 @@ def load_active_model():
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"No model file found at '{model_path}'")
 
-    return joblib.load(model_path)
\ No newline at end of file
+    return version, model_path
+
+def serving_path(model_path):
+    """File actually loaded for a resolved model: the NumPy export if present, else the pickle"""
+    export_path = os.path.join(os.path.dirname(model_path), LINEAR_EXPORT_FILE)
+    if MODEL_SERVING != "sklearn" and os.path.exists(export_path):
+        return export_path
+    return model_path
+
+def _load_model_file(path):
+    if path.endswith(".npz"):
+        return load_linear_model(path)
+    # sklearn is only imported when a pickle has to be unpickled
+    return joblib.load(path)
+
+def load_active_model():
+    """Return the active model, unpickling it only when the registry or model file changed"""
+    global _model_cache
+    registry_token = change_token(REGISTRY_PATH)
+
+    cached = _model_cache
+    if (
+        cached is not None
+        and cached.registry_token == registry_token
+        and cached.model_stat == _file_token(cached.model_path)
+    ):
+        return cached.model
+
+    with _cache_lock:
+        version, model_path = resolve_model_path(get_active_version())
+        model_path = serving_path(model_path)
+        model_stat = _file_token(model_path)
+
+        cached = _model_cache
+        if cached is not None and (cached.version, cached.model_stat) == (version, model_stat):
+            model = cached.model
+        else:
+            model = _load_model_file(model_path)
+            print(f"Loaded model version {version} from {model_path}")
+
+        _model_cache = CachedModel(registry_token, version, model_path, model_stat, model)
+        return model
+
+def clear_model_cache():
+    """Drop the cached model and version so the next call reloads from disk"""
+    global _model_cache, _version_cache
+    with _cache_lock:
+        _model_cache = None
+        _version_cache = (None, None)
@@ -1,4 +1,7 @@
+import numpy as np
 import pandas as pd
+import hashlib
+import json
 import os
 import sys
 import joblib
@@ -6,24 +9,47 @@ import joblib
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(BASE_DIR)
 
-from etl.run_pipeline import run_pipeline
-from schemas.patient_features import PatientFeatures
-from predict.model_loader import load_active_model, get_active_version
+from etl.run_pipeline import run_pipeline, iter_pipeline, run_incremental_pipeline, lookup_patient
+from etl.load.load import EXPORT_CSV, read_processed, write_parquet_part, export_csv
+from schemas.patient_features import validate_record, ingest_ehr_dataframe
+from predict.model_loader import load_active_model, get_active_version, version_dir
+from predict.scoring import SCORING_CHUNK_SIZE, validate_frame
+from predict.prediction_store import cached_scores, warm_predictions
 from model.metrics import log_metrics, load_metrics
-from model.drift import population_stability_index
+from model.drift import bin_counts, feature_psi, fit_baseline, load_baseline
+from model.drift_monitor import get_monitor
+from model.save_best_model import dataset_fingerprint
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
 
 
 #File paths
 PREDICTIONS_PATH = os.path.join(BASE_DIR,"data", "processed", "predictions.csv")
+PREDICTIONS_STORE_PATH = os.path.join(BASE_DIR, "data", "processed", "predictions.parquet")
+# Fingerprint of the last dataset whose whole-run metrics were logged, per version folder
+LOGGED_RUN_FILE = "logged_run.json"
+
+def _last_logged_run(version):
+    path = os.path.join(version_dir(version), LOGGED_RUN_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("fingerprint")
+
+def _mark_run_logged(version, fingerprint):
+    """Remember only the latest logged run, so the marker does not grow per dataset"""
+    path = os.path.join(version_dir(version), LOGGED_RUN_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"fingerprint": fingerprint}, f)
+    os.replace(tmp_path, path)
 
 def validate_row(row, feature_cols):
-    validated = PatientFeatures(**row.to_dict())
-    return pd.DataFrame([validated.dict()])[feature_cols]
+    validated = validate_record(row.to_dict())
+    return pd.DataFrame([validated])[feature_cols]
 
-def update_metrics(version, y_true, y_pred, y_prob):
-    """Calculate and Log Metrics"""
+def update_metrics(version, y_true, y_pred, y_prob, log=True):
+    """Calculate and Log Metrics (log=False only computes them)"""
     metrics = {
         "Accuracy": accuracy_score(y_true, y_pred),
         "Precision_0": precision_score(y_true, y_pred, pos_label=0),
@@ -35,83 +61,147 @@ def update_metrics(version, y_true, y_pred, y_prob):
         "AUC": roc_auc_score(y_true, y_prob),
     }
 
-    log_metrics(version, metrics)
+    if log:
+        log_metrics(version, metrics)
     return metrics
 
-def predict_all():
-    """Predict visual aura for all patients"""
-    df = run_pipeline()
+def predict_all(chunk_size=SCORING_CHUNK_SIZE, stream=False, from_store=False):
+    """Predict visual aura for all patients
 
+    With stream=True the ETL output is consumed chunk by chunk from
+    iter_pipeline and predictions are appended per chunk, so memory stays
+    bounded; nothing is returned in that mode and PSI is only logged when
+    the active version has a frozen drift baseline. With from_store=True the
+    ETL is skipped and only the needed columns are read from the processed
+    Parquet store.
+    """
     #Load versioned model via loader
     model = load_active_model()
     version = get_active_version()
     FEATURE_COLS = list(model.feature_names_in_)
 
-    missing = set(FEATURE_COLS) - set(df.columns)
-    if missing:
-        raise ValueError(f"ETL output missing required features: {missing}")
-    
-    predictions, probabilities = [], []
-
-    for _, row in df.iterrows():
-        X = validate_row(row, FEATURE_COLS)
-        predictions.append(model.predict(X)[0])
-        probabilities.append(model.predict_proba(X)[0][1])
-
-    df["predicted_aura"] = predictions
-    df["predicted_aura_prob"] = probabilities
-    df.to_csv(PREDICTIONS_PATH, index=False)
-   
+    if stream:
+        chunks = iter_pipeline(chunksize=chunk_size)
+    elif from_store:
+        chunks = [read_processed(columns=FEATURE_COLS + ["Visual", "patient_id"])]
+    else:
+        chunks = [run_pipeline()]
+    y_true, y_pred, y_prob = [], [], []
+
+    # The version's frozen training histograms, if it has them
+    baseline = load_baseline(version_dir(version))
+    drift_counts = 0
+    # Fingerprint of everything scored, built chunk by chunk
+    data_hash = hashlib.sha256()
+
+    for i, df in enumerate(chunks):
+        missing = set(FEATURE_COLS) - set(df.columns)
+        if missing:
+            raise ValueError(f"ETL output missing required features: {missing}")
+
+        X = validate_frame(df, FEATURE_COLS)
+        # Records already scored by this version are read from the prediction store
+        predictions, probabilities, _, n_scored = cached_scores(
+            model, version, X, df.get("patient_id"), chunk_size=chunk_size
+        )
+        print(f"Chunk {i}: {n_scored} of {len(X)} records scored, rest from cache")
+
+        df["predicted_aura"] = predictions
+        df["predicted_aura_prob"] = probabilities
+        write_parquet_part(df, PREDICTIONS_STORE_PATH, append=i > 0)
+        if EXPORT_CSV:
+            export_csv(df, PREDICTIONS_PATH, append=i > 0)
+
+        data_hash.update(dataset_fingerprint(X, df["Visual"]).encode())
+        y_true.append(df["Visual"].to_numpy())
+        y_pred.append(predictions)
+        y_prob.append(probabilities)
+        if baseline is not None:
+            # Run-level counts only: the online drift windows are fed once per
+            # new row by predict_new_records, not on every full re-score
+            drift_counts = drift_counts + bin_counts(baseline, X)
+
+    if not y_true:
+        print("No records to score.")
+        return None
+
+    # Same version on the same data: the metrics are already logged
+    fingerprint = data_hash.hexdigest()
+    if _last_logged_run(version) == fingerprint:
+        print(f"Metrics for version {version} on this data already logged. Skipping.")
+        return None if stream else df
 
     metrics = update_metrics(
-        version, df["Visual"], 
-        df["predicted_aura"], 
-        df["predicted_aura_prob"], 
+        version, np.concatenate(y_true),
+        np.concatenate(y_pred),
+        np.concatenate(y_prob),
+        log=False,
     )
 
-    # Drift Metrics (PSI)
-    baseline = df[FEATURE_COLS].iloc[: len(df)//2]
-    current = df[FEATURE_COLS].iloc[len(df)//2 :]
+    # Drift Metrics (PSI): scored data against the version's training histograms
+    if baseline is not None:
+        metrics.update(feature_psi(baseline, counts=drift_counts))
+    elif not stream:
+        # No frozen baseline: fall back to first half vs second half
+        metrics.update(feature_psi(fit_baseline(X.iloc[: len(X)//2]), X.iloc[len(X)//2 :]))
 
-    psi_scores = {
-        f"PSI_{col}": population_stability_index(
-            baseline[col], current[col]
-        )
-        for col in FEATURE_COLS
-    }
-    
-    metrics.update(psi_scores)
     log_metrics(version, metrics)
-    
-    return df
+    if os.path.isdir(version_dir(version)):
+        _mark_run_logged(version, fingerprint)
+
+    return None if stream else df
+
+
+def predict_new_records():
+    """Merge newly ingested rows through the incremental ETL, add them to the
+    active version's drift windows (logging the window PSI) and pre-score them.
+
+    The ETL watermark hands every row over once, so each row is counted
+    in the drift windows once.
+    """
+    df = run_incremental_pipeline()
+    if df.empty:
+        return 0
+
+    model = load_active_model()
+    version = get_active_version()
+    X = validate_frame(df, list(model.feature_names_in_))
+    monitor = get_monitor(version, version_dir(version))
+    if monitor is not None:
+        monitor.observe(X, df.get("ingestion_timestamp"))
+        monitor.log_drift(version)
+    return warm_predictions(model, version, df)
+
+
+def ingest_records(df):
+    """Bulk-insert an EHR export, then drift-check and pre-score the new rows"""
+    report = ingest_ehr_dataframe(df)
+    report["rows_scored"] = predict_new_records()
+    return report
 
 
 def predict_patient(patient_id):
     """Predict visual aura for a single patient"""
-    df = run_pipeline()
     model = load_active_model() #Use loader
-    version = get_active_version()
 
     FEATURE_COLS = list(model.feature_names_in_)
-    patient_row = df[df['patient_id'] == patient_id]
+    patient_row = lookup_patient(patient_id)
 
     if patient_row.empty:
         raise ValueError(f"No patient found with ID {patient_id}")
 
     X = validate_row(patient_row.iloc[0], FEATURE_COLS)
-    prediction = model.predict(X)[0]
-    probability = model.predict_proba(X)[0][1]
-
-    update_metrics(
-        version, 
-        [patient_row["Visual"].values[0]], 
-        [prediction], 
-        [probability], 
-        patient_ids=[patient_id]
-    )
+    predictions, probabilities, _, _ = cached_scores(model, get_active_version(), X, patient_row["patient_id"].iloc[:1])
+    prediction, probability = predictions[0], probabilities[0]
 
     return prediction, probability, patient_row
 
 
 if __name__ == "__main__":
-    predict_all()
\ No newline at end of file
+    if "--ingest" in sys.argv:
+        # python predict/predict_aura.py --ingest export.csv
+        ingest_records(pd.read_csv(sys.argv[sys.argv.index("--ingest") + 1]))
+    elif "--new" in sys.argv:
+        predict_new_records()
+    else:
+        predict_all()
\ No newline at end of file
@@ -0,0 +1,185 @@
+import os
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from data.db import get_engine
+from predict.scoring import SCORING_CHUNK_SIZE, validate_frame, score_frame
+from etl.load.load import read_processed, store_exists
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Scored records per model version, keyed by a hash of the record's feature values
+PREDICTIONS_DB_PATH = os.path.join(BASE_DIR, "data", "processed", "predictions.db")
+PREDICTIONS_DB_URI = os.getenv("PREDICTIONS_DATABASE_URL", f"sqlite:///{PREDICTIONS_DB_PATH}")
+
+# Hashes per SELECT ... IN (...) (below SQLite's bound-parameter limit)
+LOOKUP_BATCH_SIZE = 900
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _init_store(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS predictions(
+                record_hash INTEGER NOT NULL,
+                version TEXT NOT NULL,
+                patient_id INTEGER,
+                prediction INTEGER NOT NULL,
+                probability REAL NOT NULL,
+                contributions BLOB,
+                scored_at TEXT NOT NULL,
+                PRIMARY KEY (record_hash, version)
+            )
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_predictions_version_patient ON predictions(version, patient_id)"
+        ))
+
+def _store():
+    """Engine for the prediction store, creating the table once"""
+    uri = PREDICTIONS_DB_URI
+    engine = get_engine(uri)
+    if uri not in _initialized:
+        with _init_lock:
+            if uri not in _initialized:
+                _init_store(engine)
+                _initialized.add(uri)
+    return engine
+
+def record_hashes(X):
+    """64-bit content hash of every row of a validated feature frame (as signed ints for SQLite)"""
+    values = pd.DataFrame(X.to_numpy(dtype="float64"))
+    return pd.util.hash_pandas_object(values, index=False).to_numpy().view("int64")
+
+def lookup_predictions(version, hashes):
+    """Stored rows for `hashes` under `version`: DataFrame indexed by record_hash"""
+    unique = pd.unique(np.asarray(hashes, dtype="int64")).tolist()
+    rows = []
+    with _store().connect() as conn:
+        for start in range(0, len(unique), LOOKUP_BATCH_SIZE):
+            batch = unique[start:start + LOOKUP_BATCH_SIZE]
+            names = ", ".join(f":h{i}" for i in range(len(batch)))
+            params = {f"h{i}": h for i, h in enumerate(batch)}
+            params["version"] = str(version)
+            rows.extend(conn.execute(text(
+                "SELECT record_hash, prediction, probability, contributions FROM predictions "
+                f"WHERE version = :version AND record_hash IN ({names})"
+            ), params).all())
+
+    return pd.DataFrame(
+        rows, columns=["record_hash", "prediction", "probability", "contributions"]
+    ).set_index("record_hash")
+
+def store_predictions(version, hashes, predictions, probabilities, contributions=None, patient_ids=None):
+    """Bulk upsert scored records, one executemany per call"""
+    scored_at = datetime.utcnow().isoformat(timespec="seconds")
+    if patient_ids is None:
+        patient_ids = [None] * len(hashes)
+    blobs = [None] * len(hashes) if contributions is None else [
+        row.tobytes() for row in np.ascontiguousarray(contributions, dtype="float64")
+    ]
+    records = [
+        {
+            "record_hash": int(h), "version": str(version), "patient_id": None if pd.isna(pid) else int(pid),
+            "prediction": int(pred), "probability": float(prob), "contributions": blob,
+            "scored_at": scored_at,
+        }
+        for h, pid, pred, prob, blob in zip(hashes, patient_ids, predictions, probabilities, blobs)
+    ]
+    if not records:
+        return 0
+
+    with _store().begin() as conn:
+        conn.execute(text("""
+            INSERT OR REPLACE INTO predictions
+                (record_hash, version, patient_id, prediction, probability, contributions, scored_at)
+            VALUES (:record_hash, :version, :patient_id, :prediction, :probability, :contributions, :scored_at)
+        """), records)
+    return len(records)
+
+def cached_scores(model, version, X, patient_ids=None, chunk_size=SCORING_CHUNK_SIZE):
+    """Predictions for a validated frame, scoring only records the store has not seen for `version`.
+
+    Returns (predictions, probabilities, contributions, n_scored); contributions
+    is an (n_rows, n_features) array, or None for models without coefficients,
+    and n_scored counts the distinct records that had to be scored.
+    """
+    hashes = record_hashes(X)
+    stored = lookup_predictions(version, hashes)
+    missing = ~np.isin(hashes, stored.index.to_numpy())
+
+    linear = getattr(model, "coef_", None) is not None
+    n_scored = 0
+    if missing.any():
+        X_new = X[missing]
+        # Identical records within the batch are scored (and stored) once
+        new_hashes, first = np.unique(hashes[missing], return_index=True)
+        X_new = X_new.iloc[first]
+        n_scored = len(X_new)
+        preds, probs = score_frame(model, X_new, chunk_size=chunk_size)
+        contrib = None
+        if linear:
+            contrib = X_new.to_numpy(dtype="float64") * np.asarray(model.coef_[0], dtype="float64")
+        ids = None if patient_ids is None else np.asarray(patient_ids)[missing][first]
+        store_predictions(version, new_hashes, preds, probs, contrib, ids)
+
+        scored = pd.DataFrame(
+            {"prediction": preds, "probability": probs,
+             "contributions": [row.tobytes() for row in contrib] if linear else [None] * len(preds)},
+            index=pd.Index(new_hashes, name="record_hash"),
+        )
+        stored = pd.concat([stored, scored]) if len(stored) else scored
+
+    rows = stored.loc[hashes]
+    contributions = None
+    if linear:
+        # One buffer for all rows instead of one array per row
+        contributions = np.frombuffer(b"".join(rows["contributions"]), dtype="float64").reshape(len(rows), X.shape[1])
+    return (
+        rows["prediction"].to_numpy(dtype="int64"),
+        rows["probability"].to_numpy(dtype="float64"),
+        contributions,
+        n_scored,
+    )
+
+def fill_predictions(model, version, X, patient_ids=None):
+    """Score and store every record of X not yet cached for `version`; returns how many were scored"""
+    return cached_scores(model, version, X, patient_ids)[3]
+
+def warm_predictions(model, version, df=None):
+    """Bulk-fill the store for a newly activated version (by default from the processed dataset)"""
+    feature_cols = list(model.feature_names_in_)
+    if df is None:
+        if not store_exists():
+            return 0
+        df = read_processed(columns=feature_cols + ["patient_id"])
+
+    X = validate_frame(df, feature_cols)
+    n_scored = fill_predictions(model, version, X, df.get("patient_id"))
+    print(f"Prediction cache for version {version}: {n_scored} of {len(X)} records scored")
+    return n_scored
+
+def prune_predictions(keep_versions):
+    """Drop cached predictions of every version not in keep_versions; returns the rows deleted"""
+    keep_versions = [str(v) for v in keep_versions]
+    names = ", ".join(f":v{i}" for i in range(len(keep_versions))) or "NULL"
+    with _store().begin() as conn:
+        deleted = conn.execute(
+            text(f"DELETE FROM predictions WHERE version NOT IN ({names})"),
+            {f"v{i}": v for i, v in enumerate(keep_versions)},
+        ).rowcount
+    if deleted:
+        print(f"Pruned {deleted} cached predictions of retired versions")
+    return deleted
+
+def forget_predictions(version):
+    """Drop every cached prediction of `version` (its model file was replaced in place)"""
+    with _store().begin() as conn:
+        deleted = conn.execute(text("DELETE FROM predictions WHERE version = :version"), {"version": str(version)}).rowcount
+    if deleted:
+        print(f"Dropped {deleted} cached predictions of replaced version {version}")
+    return deleted
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from schemas.patient_features import validate_columns
+
+# Rows scored per predict_proba call
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", 50_000))
+
+
+def validate_frame(df, feature_cols):
+    """Validate feature columns of a whole frame at once and return them as integers"""
+    missing = [col for col in feature_cols if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required features: {missing}")
+
+    return validate_columns(df, feature_cols)
+
+
+def iter_chunks(X, chunk_size=SCORING_CHUNK_SIZE):
+    """Yield consecutive row slices of X"""
+    chunk_size = max(int(chunk_size), 1)
+    for start in range(0, len(X), chunk_size):
+        yield X.iloc[start:start + chunk_size]
+
+
+def score_frame(model, X, chunk_size=SCORING_CHUNK_SIZE):
+    """Score a validated feature frame with one predict_proba call per chunk.
+
+    Returns (predictions, probabilities) as NumPy arrays. Labels are taken
+    from the class probabilities instead of a second model.predict pass.
+    """
+    classes = np.asarray(getattr(model, "classes_", [0, 1]))
+    predictions = np.empty(len(X), dtype=classes.dtype)
+    probabilities = np.empty(len(X), dtype="float64")
+
+    offset = 0
+    for chunk in iter_chunks(X, chunk_size):
+        proba = np.asarray(model.predict_proba(chunk))
+        end = offset + len(chunk)
+        predictions[offset:end] = classes[np.argmax(proba, axis=1)]
+        probabilities[offset:end] = proba[:, 1]
+        offset = end
+
+    return predictions, probabilities
@@ -1,8 +1,14 @@
+import os
+import time
+import numpy as np
 import pandas as pd
-import sqlalchemy
-from data.db import DB_PATH
+from data.db import get_engine
+from data.init_db import init_db
 from pydantic import BaseModel, Field
 
+# Rows per INSERT transaction during bulk ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 50_000))
+
 COLUMN_MAP = {
     "Age": "age",
     "Duration": "duration",
@@ -30,12 +36,12 @@ COLUMN_MAP = {
     "Paresthesia": "paresthesia",
     "DPF": "dpf",
 
-    "Type_Familial hemiplegic migraine": "type_familial_hemiplegic",
+    "Type_Familial hemiplegic migraine": "type_familial_hemiplegic_migraine",
     "Type_Migraine without aura": "type_migraine_no_aura",
     "Type_Other": "type_other",
-    "Type_Sporadic hemiplegic migraine": "type_sporadic_hemiplegic",
-    "Type_Typical aura with migraine": "type_typical_aura_with",
-    "Type_Typical aura without migraine": "type_typical_aura_without",
+    "Type_Sporadic hemiplegic migraine": "type_sporadic_hemiplegic_migraine",
+    "Type_Typical aura with migraine": "type_typical_aura_with_migraine",
+    "Type_Typical aura without migraine": "type_typical_aura_without_migraine",
 }
 
 class PatientFeatures(BaseModel):
@@ -72,6 +78,90 @@ class PatientFeatures(BaseModel):
 
 REQUIRED_COLUMNS = {"patient_id"} | set(COLUMN_MAP.keys())
 
+# PatientFeatures field name -> dataset column ("Type_Other" / "Type_Migraine without aura")
+FIELD_TO_COLUMN = {col.replace(" ", "_"): col for col in COLUMN_MAP}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when columns break PatientFeatures constraints.
+
+    `errors` maps each offending column to the row index labels that failed.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = ", ".join(
+            f"{col} (rows {rows[:5]}{'...' if len(rows) > 5 else ''})"
+            for col, rows in errors.items()
+        )
+        super().__init__(f"Invalid values for features: {details}")
+
+
+def _build_column_constraints():
+    """Read bounds and defaults off the PatientFeatures fields, keyed by dataset column"""
+    constraints = {}
+    for name, field in PatientFeatures.model_fields.items():
+        ge = next((m.ge for m in field.metadata if hasattr(m, "ge")), None)
+        le = next((m.le for m in field.metadata if hasattr(m, "le")), None)
+        constraints[FIELD_TO_COLUMN.get(name, name)] = {
+            "ge": ge,
+            "le": le,
+            "required": field.is_required(),
+            "default": None if field.is_required() else field.default,
+        }
+    return constraints
+
+COLUMN_CONSTRAINTS = _build_column_constraints()
+
+
+def find_invalid_rows(df: pd.DataFrame, columns=None) -> dict:
+    """Check whole columns against PatientFeatures and return {column: [row index, ...]}"""
+    columns = list(COLUMN_CONSTRAINTS) if columns is None else list(columns)
+    errors = {}
+
+    for col in columns:
+        rule = COLUMN_CONSTRAINTS.get(col)
+        if col not in df.columns:
+            if rule is None or rule["required"]:
+                errors[col] = df.index.tolist()
+            continue
+
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+        bad = np.isnan(values) | (values != np.round(values))
+        if rule is not None and rule["ge"] is not None:
+            bad |= values < rule["ge"]
+        if rule is not None and rule["le"] is not None:
+            bad |= values > rule["le"]
+
+        if bad.any():
+            errors[col] = df.index[bad].tolist()
+
+    return errors
+
+
+def validate_columns(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """Columnar counterpart of PatientFeatures: validate a frame and return it as integers"""
+    columns = list(COLUMN_CONSTRAINTS) if columns is None else list(columns)
+
+    errors = find_invalid_rows(df, columns)
+    if errors:
+        raise SchemaValidationError(errors)
+
+    validated = {}
+    for col in columns:
+        if col in df.columns:
+            validated[col] = pd.to_numeric(df[col]).astype("int64")
+        else:
+            validated[col] = np.full(len(df), COLUMN_CONSTRAINTS[col]["default"], dtype="int64")
+    return pd.DataFrame(validated, index=df.index)
+
+
+def validate_record(record: dict) -> dict:
+    """Validate a single record through PatientFeatures, keyed by dataset column"""
+    fields = {key.replace(" ", "_"): value for key, value in record.items()}
+    validated = PatientFeatures(**fields)
+    return {FIELD_TO_COLUMN.get(k, k): v for k, v in validated.model_dump().items()}
+
 
 def validate_schema(df: pd.DataFrame):
     missing = REQUIRED_COLUMNS - set(df.columns)
@@ -79,26 +169,48 @@ def validate_schema(df: pd.DataFrame):
         raise ValueError(f"Missing required columns: {missing}")
 
 
-def ingest_ehr_dataframe(df: pd.DataFrame):
+def ingest_ehr_dataframe(df: pd.DataFrame, batch_size=INGEST_BATCH_SIZE, engine=None) -> dict:
+    """Bulk-insert an EHR export into patient_records.
+
+    Rows are written with executemany, one transaction per `batch_size`
+    rows, on the shared WAL-journaled engine. Returns a throughput report.
+    Drift windows are fed from the transformed rows by
+    predict.predict_aura.predict_new_records.
+    """
     # Validate
     validate_schema(df)
+    engine = engine or get_engine()
+    init_db(engine)
 
     # Normalize column names
+    columns = ["patient_id"] + list(COLUMN_MAP.values())
     df = df.rename(columns=COLUMN_MAP)
 
-    # Enforce numeric types
-    for col in COLUMN_MAP.values():
-        df[col] = (
-            pd.to_numeric(df[col], errors="coerce")
-            .fillna(0)
-            .astype(int)
-        )
-
-    # Write to SQL
-    engine = sqlalchemy.create_engine(DB_PATH)
-    df.to_sql(
-        "patient_records",
-        engine,
-        if_exists="append",
-        index=False
-    )
\ No newline at end of file
+    # Enforce numeric types for the whole block at once
+    block = df[columns]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+        block = block.apply(pd.to_numeric, errors="coerce")
+    values = np.nan_to_num(block.to_numpy(dtype="float64"), nan=0.0).astype("int64")
+
+    insert_sql = (
+        f"INSERT INTO patient_records ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+    # WAL and the other write pragmas come from data.db.get_engine()
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for offset in range(0, len(values), batch_size):
+            batch = values[offset:offset + batch_size].tolist()
+            with conn.begin():
+                conn.exec_driver_sql(insert_sql, [tuple(row) for row in batch])
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "rows": len(values),
+        "batches": -(-len(values) // batch_size),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(values) / elapsed) if elapsed > 0 else len(values),
+    }
+    print(f"Ingested {report['rows']} rows in {report['seconds']}s ({report['rows_per_sec']} rows/sec)")
+    return report
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_prediction_store(tmp_path, monkeypatch):
+    """Keep cached predictions of test models out of the real prediction store"""
+    from predict import prediction_store
+    monkeypatch.setattr(prediction_store, "PREDICTIONS_DB_URI", f"sqlite:///{tmp_path / 'predictions.db'}")
+
+
+@pytest.fixture(autouse=True)
+def isolated_job_store(tmp_path, monkeypatch):
+    """Keep test jobs out of the shared job store"""
+    from model import jobs
+    monkeypatch.setattr(jobs, "JOBS_DB_URI", f"sqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setattr(jobs, "JOBS_LOCK_PATH", str(tmp_path / "jobs.db.lock"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_drift_windows(tmp_path, monkeypatch):
+    """Keep drift window counts of test monitors out of the shared store"""
+    from model import drift_monitor
+    monkeypatch.setattr(drift_monitor, "DRIFT_DB_URI", f"sqlite:///{tmp_path / 'drift.db'}")
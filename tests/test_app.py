@@ -1,6 +1,7 @@
 import pytest
 import pandas as pd
 from webapp.app import app, ADMIN_USERNAME, ADMIN_PASSWORD
+from model.metrics import build_metrics_view
 
 # -----------------------------
 # Fixtures
@@ -114,8 +115,9 @@ def test_invalid_login(client):
 # Patient prediction tests
 # -----------------------------
 def test_patient_prediction(client, monkeypatch, sample_df):
-    # Patch run_pipeline
-    monkeypatch.setattr("webapp.app.run_pipeline", lambda: sample_df)
+    # Patch the cached pipeline
+    monkeypatch.setattr("webapp.app.load_processed_data", lambda: sample_df)
+    monkeypatch.setattr("webapp.app.lookup_patient", lambda pid: sample_df[sample_df["patient_id"] == pid])
     # Mock model
     class MockModel:
         feature_names_in_ = sample_df.columns[1:]
@@ -138,7 +140,8 @@ def test_patient_prediction(client, monkeypatch, sample_df):
     assert b"Prediction" in response.data or b"prediction" in response.data
 
 def test_invalid_patient(client, monkeypatch):
-    monkeypatch.setattr("webapp.app.run_pipeline", lambda: pd.DataFrame({"patient_id":[1]}))
+    monkeypatch.setattr("webapp.app.load_processed_data", lambda: pd.DataFrame({"patient_id":[1]}))
+    monkeypatch.setattr("webapp.app.lookup_patient", lambda pid: pd.DataFrame({"patient_id": []}))
     class DummyModel:
         feature_names_in_ = ["dummy"]
         coef_ = [[0.0]]
@@ -166,7 +169,7 @@ def test_metrics_page(admin_session, monkeypatch):
         }]
     }
 
-    monkeypatch.setattr("webapp.app.load_metrics", lambda: fake_metrics)
+    monkeypatch.setattr("webapp.app.load_metrics_view", lambda: build_metrics_view(fake_metrics))
 
     response = admin_session.get("/metrics", follow_redirects=False)
 
@@ -175,8 +178,240 @@ def test_metrics_page(admin_session, monkeypatch):
     assert b"accuracy" in data or b"auc" in data
         
 def test_empty_metrics_file(admin_session, monkeypatch):
-    monkeypatch.setattr("webapp.app.load_metrics", lambda: {"v1": []})
+    monkeypatch.setattr("webapp.app.load_metrics_view", lambda: build_metrics_view({"v1": []}))
     response = admin_session.get("/metrics", follow_redirects=True)
     assert response.status_code == 200
     # Page should handle empty metrics gracefully
-    assert b"no metrics" in response.data.lower() or b"metrics" in response.data.lower()
\ No newline at end of file
+    assert b"no metrics" in response.data.lower() or b"metrics" in response.data.lower()
+
+def test_index_admin_metrics_chart(admin_session, monkeypatch):
+    fake_metrics = {
+        "v1": [{"timestamp": "2024-01-20T19:12:03", "Accuracy": 0.94, "PSI_Age": 0.05}],
+        "v2": [{"timestamp": "2024-02-20T19:12:03", "Accuracy": 0.91, "AUC": 0.9}],
+    }
+    monkeypatch.setattr("webapp.app.load_metrics_view", lambda: build_metrics_view(fake_metrics))
+
+    response = admin_session.get("/?metric=AUC")
+    assert response.status_code == 200
+    assert b"AUC Over Time" in response.data
+
+# -----------------------------
+# Background retrain tests
+# -----------------------------
+def test_retrain_requires_admin(client):
+    assert client.post("/retrain").status_code == 403
+    assert client.get("/jobs/abc").status_code == 403
+
+def test_retrain_post_returns_job_without_blocking(admin_session, monkeypatch, sample_df):
+    from model.jobs import JobRunner
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr("webapp.app.load_processed_data", lambda: sample_df)
+    monkeypatch.setattr(
+        "webapp.app.submit_retrain",
+        lambda df: runner.submit("retrain", lambda df, progress: "v-test", df, fingerprint="fp"),
+    )
+    monkeypatch.setattr("webapp.app.get_job", runner.get)
+
+    response = admin_session.post("/retrain")
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    runner.get(job_id).future.result(5)
+
+    status = admin_session.get(f"/jobs/{job_id}").get_json()
+    assert status["status"] == "succeeded"
+    assert status["result"] == "v-test"
+    assert admin_session.get("/jobs/unknown").status_code == 404
+    runner.shutdown()
+
+# -----------------------------
+# Batch prediction API tests
+# -----------------------------
+def test_api_predict_json_batch(client, sample_df):
+    records = sample_df.to_dict(orient="records")
+    response = client.post("/api/predict", json={"records": records})
+    assert response.status_code == 200
+
+    body = response.get_json()
+    assert body["count"] == 2
+    assert [p["patient_id"] for p in body["predictions"]] == [1, 2]
+    first = body["predictions"][0]
+    assert 0.0 <= first["probability"] <= 1.0
+    assert first["prediction"] in (0, 1)
+    from predict.model_loader import load_active_model
+    assert set(first["contributions"]) == set(load_active_model().feature_names_in_)
+
+def test_api_predict_ndjson_matches_json(client, sample_df):
+    records = sample_df.to_json(orient="records", lines=True)
+    ndjson = client.post("/api/predict?contributions=0", data=records, content_type="application/x-ndjson")
+    assert ndjson.status_code == 200
+    assert "contributions" not in ndjson.get_json()["predictions"][0]
+
+    as_json = client.post("/api/predict", json=sample_df.to_dict(orient="records")).get_json()
+    assert [p["probability"] for p in ndjson.get_json()["predictions"]] == \
+        [p["probability"] for p in as_json["predictions"]]
+
+def test_api_predict_validation_errors(client):
+    # Age is required; out-of-range binary flags are rejected per row
+    response = client.post("/api/predict", json=[{"Age": 30, "Nausea": 3}, {"Nausea": 0}])
+    assert response.status_code == 422
+    errors = response.get_json()["errors"]
+    assert errors["Nausea"] == [0]
+    assert errors["Age"] == [1]
+
+    assert client.post("/api/predict", data="not json", content_type="application/json").status_code == 400
+
+def test_api_predict_record_limit(client, monkeypatch):
+    monkeypatch.setattr("webapp.app.API_MAX_RECORDS", 2)
+    response = client.post("/api/predict", json=[{"Age": 30}] * 3)
+    assert response.status_code == 413
+
+def test_api_predict_top_k_contributions(client, sample_df):
+    response = client.post("/api/predict?top_k=3", json=sample_df.to_dict(orient="records"))
+    assert response.status_code == 200
+    for prediction in response.get_json()["predictions"]:
+        assert len(prediction["contributions"]) == 3
+
+    for bad in ("0", "-1", "abc"):
+        response = client.post(f"/api/predict?top_k={bad}", json=sample_df.to_dict(orient="records"))
+        assert response.status_code == 400
+
+def test_api_predict_feeds_shared_drift_windows(client, sample_df, monkeypatch):
+    from model import drift
+    from model.drift_monitor import DriftMonitor
+    from predict.model_loader import load_active_model
+    feature_cols = list(load_active_model().feature_names_in_)
+    baseline = drift.fit_baseline(sample_df[feature_cols])
+    monkeypatch.setattr("webapp.app.get_monitor", lambda version, version_dir: DriftMonitor(baseline, version))
+
+    client.post("/api/predict", json=sample_df.to_dict(orient="records"))
+    client.post("/api/predict", json=sample_df.to_dict(orient="records"))
+    # A fresh monitor (another worker) reads the same windows
+    from webapp.app import get_active_version
+    assert DriftMonitor(baseline, get_active_version()).rows(windows=2) == 2 * len(sample_df)
+
+# -----------------------------
+# Startup tests
+# -----------------------------
+def test_cold_import_is_lazy():
+    import json
+    import os
+    import subprocess
+    import sys
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    # Importing only registers routes: no ensure_model, so the real model/ tree is not touched
+    code = (
+        "import json, sys, webapp.app as m;"
+        "m.create_app(startup=False);"
+        "print(json.dumps([name for name in ('sklearn', 'plotly', 'model.save_best_model') if name in sys.modules]))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=base_dir, capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+def test_startup_seconds_are_per_app(monkeypatch):
+    import time
+    from webapp import app as app_module
+    monkeypatch.setattr(app_module, "_startup", lambda: time.sleep(0.05))
+    other = app_module.create_app(startup=True)
+    assert 0.05 <= other.config["STARTUP_SECONDS"] < time.perf_counter() - app_module._IMPORT_STARTED
+    assert other.config["IMPORT_SECONDS"] == app_module.IMPORT_SECONDS
+
+def test_startup_over_budget_is_logged(monkeypatch, caplog):
+    import time
+    from webapp import app as app_module
+    monkeypatch.setattr(app_module, "_startup", lambda: time.sleep(0.05))
+
+    monkeypatch.setattr(app_module, "STARTUP_BUDGET_SECONDS", 10.0)
+    with caplog.at_level("WARNING"):
+        app_module.create_app(startup=True)
+    assert not [r for r in caplog.records if "budget" in r.getMessage()]
+
+    monkeypatch.setattr(app_module, "STARTUP_BUDGET_SECONDS", 0.01)
+    with caplog.at_level("WARNING"):
+        slow = app_module.create_app(startup=True)
+    warnings = [r for r in caplog.records if "budget" in r.getMessage()]
+    assert slow.config["STARTUP_SECONDS"] > app_module.STARTUP_BUDGET_SECONDS
+    assert len(warnings) == 1 and warnings[0].levelname == "WARNING"
+
+def test_create_app_startup_leaves_artifacts_alone(tmp_path, monkeypatch):
+    import functools
+    import os
+    import shutil
+    from webapp import app as app_module
+    from model.registry import change_token
+    from model.save_pretrained_model import ensure_model
+    from predict import model_loader
+
+    # Startup runs against a copy of the model artifacts, never the real model/ tree
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    model_dir = tmp_path / "model"
+    shutil.copytree(
+        os.path.join(base_dir, "model"), model_dir,
+        ignore=shutil.ignore_patterns("*.py", "__pycache__", "*.db*", "*.lock", "*.json"),
+    )
+    registry = str(model_dir / "registry.json")
+    monkeypatch.setattr(app_module, "ensure_model", functools.partial(ensure_model, model_dir=str(model_dir)))
+    monkeypatch.setattr(model_loader, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry)
+    model_loader.clear_model_cache()
+    real_token = change_token()
+
+    # First start writes the registry; a restart with unchanged artifacts leaves it alone
+    app_module.create_app({"TESTING": True})
+    before = change_token(registry)
+    other = app_module.create_app({"TESTING": True})
+    assert change_token(registry) == before
+    assert change_token() == real_token
+    assert {rule.endpoint for rule in other.url_map.iter_rules()} >= {"index", "api_predict", "job_status", "login"}
+    model_loader.clear_model_cache()
+
+def test_post_fork_reset_drops_per_process_state():
+    import os
+    from webapp import wsgi
+    from model import jobs
+    from data import db
+    # Importing the entry point builds no app and leaves the environment alone
+    assert wsgi._app is None
+    assert os.environ.get("PIPELINE_SNAPSHOT_PATH") != wsgi.DEFAULT_SNAPSHOT_PATH
+
+    runner = jobs.get_runner()
+    engine = db.get_engine("sqlite://")
+    wsgi.post_fork_reset()
+    assert jobs.get_runner() is not runner
+    assert db.get_engine("sqlite://") is not engine
+    runner.shutdown()
+
+def test_wsgi_app_is_built_once_on_first_access(tmp_path, monkeypatch):
+    from webapp import wsgi
+    from webapp import app as app_module
+    from etl import run_pipeline
+    built = []
+    monkeypatch.setattr(app_module, "create_app", lambda: built.append(1) or app_module.app)
+    monkeypatch.setattr(wsgi, "WSGI_PRELOAD_DATA", False)
+    monkeypatch.setattr(wsgi, "DEFAULT_SNAPSHOT_PATH", str(tmp_path / "snapshot.arrow"))
+    monkeypatch.setattr(wsgi, "_app", None)
+    monkeypatch.setattr(run_pipeline, "SNAPSHOT_PATH", None)
+
+    assert wsgi.app is app_module.app
+    assert wsgi.app is app_module.app
+    assert built == [1]
+    assert run_pipeline.SNAPSHOT_PATH == str(tmp_path / "snapshot.arrow")
+
+def test_gunicorn_config_smoke(monkeypatch):
+    import os
+    import runpy
+    from webapp import wsgi
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    config = runpy.run_path(os.path.join(base_dir, "gunicorn.conf.py"))
+
+    assert config["wsgi_app"] == "webapp.wsgi:app"
+    assert config["workers"] == 3
+    assert config["threads"] >= 1
+    assert config["preload_app"] is True
+    assert config["bind"].startswith("0.0.0.0:")
+
+    # The hook gunicorn calls in each worker after fork
+    reset = []
+    monkeypatch.setattr(wsgi, "post_fork_reset", lambda: reset.append(1))
+    config["post_fork"](None, None)
+    assert reset == [1]
@@ -0,0 +1,42 @@
+import threading
+from sqlalchemy import text
+from data import db
+
+# -----------------------------
+# Test shared engine registry
+# -----------------------------
+def test_get_engine_is_shared_per_uri(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'a.db'}"
+    assert db.get_engine(uri) is db.get_engine(uri)
+    assert db.get_engine(uri) is not db.get_engine(f"sqlite:///{tmp_path / 'b.db'}")
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    engine = db.get_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == db.SQLITE_PRAGMAS["cache_size"]
+
+def test_engine_reads_during_write_from_other_threads(tmp_path):
+    engine = db.get_engine(f"sqlite:///{tmp_path / 'threads.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    counts = []
+    with engine.connect() as writer:
+        writer.begin()
+        writer.execute(text("INSERT INTO t VALUES (2)"))
+
+        def read():
+            with engine.connect() as conn:
+                counts.append(conn.execute(text("SELECT COUNT(*) FROM t")).scalar())
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.commit()
+
+    assert counts == [1, 1, 1, 1]
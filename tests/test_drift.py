@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import pytest
+from model import drift
+from model import metrics as metrics_module
+from model.drift_monitor import DriftMonitor
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _frame(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Age": rng.integers(15, 80, n),
+        "Nausea": rng.integers(0, 2, n),
+        "Character": rng.integers(1, 3, n),
+    })
+
+# -----------------------------
+# Test fit_baseline() / bin_counts()
+# -----------------------------
+def test_categorical_features_get_one_bin_per_value():
+    X = _frame()
+    baseline = drift.fit_baseline(X)
+
+    nausea = baseline["features"].index("Nausea")
+    assert baseline["counts"][nausea].sum() == len(X)
+    # Bins: below 0, ==0, between 0 and 1, ==1, above 1
+    assert baseline["counts"][nausea][[1, 3]].tolist() == np.bincount(X["Nausea"]).tolist()
+    assert np.isinf(baseline["edges"][nausea][4:]).all()
+
+def test_new_values_get_their_own_bins():
+    X = _frame()
+    X["Constant"] = 0
+    baseline = drift.fit_baseline(X)
+
+    current = X.copy()
+    current["Constant"] = np.r_[np.ones(500), np.zeros(len(X) - 500)]
+    current["Nausea"] = np.r_[np.full(500, 2), X["Nausea"].iloc[500:]]
+    current["Age"] = np.r_[np.full(500, 120), X["Age"].iloc[500:]]
+    psi = drift.feature_psi(baseline, current)
+    assert psi["PSI_Constant"] > 1
+    assert psi["PSI_Nausea"] > 1
+    # Values above the baseline maximum land in the overflow bin, not the top bin
+    assert drift.bin_counts(baseline, current)[baseline["features"].index("Age")][-1] == 500
+
+def test_bin_counts_match_per_column_histogram():
+    X = _frame()
+    baseline = drift.fit_baseline(X)
+    current = _frame(seed=1)
+
+    counts = drift.bin_counts(baseline, current)
+    age = baseline["features"].index("Age")
+    edges = baseline["edges"][age]
+    expected = np.bincount(np.searchsorted(edges, current["Age"], side="right"), minlength=counts.shape[1])
+    assert counts[age].tolist() == expected.tolist()
+
+def test_bin_counts_accumulate_across_chunks(monkeypatch):
+    X = _frame()
+    baseline = drift.fit_baseline(X)
+    monkeypatch.setattr(drift, "BINNING_CHUNK_ROWS", 128)
+
+    chunked = drift.bin_counts(baseline, X.iloc[:700]) + drift.bin_counts(baseline, X.iloc[700:])
+    assert (chunked == baseline["counts"]).all()
+
+# -----------------------------
+# Test feature_psi()
+# -----------------------------
+def test_feature_psi_is_zero_on_identical_data_and_grows_with_shift():
+    X = _frame()
+    baseline = drift.fit_baseline(X)
+
+    same = drift.feature_psi(baseline, X)
+    assert set(same) == {"PSI_Age", "PSI_Nausea", "PSI_Character"}
+    assert all(v == pytest.approx(0.0) for v in same.values())
+
+    shifted = X.assign(Nausea=1)
+    psi = drift.feature_psi(baseline, shifted)
+    assert psi["PSI_Nausea"] > 1.0
+    assert psi["PSI_Age"] == pytest.approx(0.0)
+
+def test_feature_psi_from_precomputed_counts():
+    X = _frame()
+    baseline = drift.fit_baseline(X.iloc[:1000])
+    counts = drift.bin_counts(baseline, X.iloc[1000:])
+
+    assert drift.feature_psi(baseline, counts=counts) == drift.feature_psi(baseline, X.iloc[1000:])
+
+# -----------------------------
+# Test save_baseline() / load_baseline()
+# -----------------------------
+def test_baseline_round_trip(tmp_path):
+    assert drift.load_baseline(str(tmp_path)) is None
+
+    baseline = drift.fit_baseline(_frame())
+    drift.save_baseline(baseline, str(tmp_path))
+    loaded = drift.load_baseline(str(tmp_path))
+
+    assert loaded["features"] == baseline["features"]
+    np.testing.assert_array_equal(loaded["edges"], baseline["edges"])
+    np.testing.assert_array_equal(loaded["counts"], baseline["counts"])
+    assert drift.load_baseline(str(tmp_path)) is loaded
+
+# -----------------------------
+# Test DriftMonitor
+# -----------------------------
+HOUR = 3600
+T0 = 1_700_000_000 - 1_700_000_000 % HOUR
+
+def _ts(seconds, n):
+    return pd.to_datetime(np.full(n, seconds), unit="s")
+
+def test_monitor_windows_are_mergeable():
+    X = _frame()
+    monitor = DriftMonitor(drift.fit_baseline(X), window_seconds=HOUR)
+
+    returned = monitor.observe(X.iloc[:500], _ts(T0 + 10, 500))
+    monitor.observe(X.iloc[500:1200], _ts(T0 + HOUR + 10, 700))
+    monitor.observe(X.iloc[1200:], _ts(T0 + 2 * HOUR + 10, 800))
+
+    assert (returned == drift.bin_counts(monitor.baseline, X.iloc[:500])).all()
+    assert monitor.rows(end=T0 + 2 * HOUR) == 800
+    # A sliding window over the last three hours is the sum of the tumbling ones
+    assert (monitor.window_counts(windows=3, end=T0 + 2 * HOUR) == monitor.baseline["counts"]).all()
+    assert all(v == pytest.approx(0.0) for v in monitor.psi(windows=3, end=T0 + 2 * HOUR).values())
+
+def test_monitor_psi_reflects_only_the_current_window():
+    X = _frame()
+    monitor = DriftMonitor(drift.fit_baseline(X), window_seconds=HOUR)
+
+    monitor.observe(X, _ts(T0, len(X)))
+    monitor.observe(X.assign(Nausea=1), _ts(T0 + HOUR, len(X)))
+
+    assert monitor.psi(end=T0)["PSI_Nausea"] == pytest.approx(0.0)
+    assert monitor.psi(end=T0 + HOUR)["PSI_Nausea"] > 1.0
+    assert monitor.psi(end=T0 + 5 * HOUR) == {}
+
+def test_monitor_drops_windows_past_retention():
+    X = _frame(n=100)
+    monitor = DriftMonitor(drift.fit_baseline(X), window_seconds=HOUR, retain=2)
+
+    for i in range(4):
+        monitor.observe(X, _ts(T0 + i * HOUR, len(X)))
+
+    assert monitor.window_starts() == [T0 + 2 * HOUR, T0 + 3 * HOUR]
+
+def test_monitor_windows_are_shared_between_processes():
+    X = _frame()
+    baseline = drift.fit_baseline(X)
+    # Two workers (or two CLI runs) feeding the same version's windows
+    first = DriftMonitor(baseline, "v1", window_seconds=HOUR)
+    second = DriftMonitor(baseline, "v1", window_seconds=HOUR)
+    other_version = DriftMonitor(baseline, "v2", window_seconds=HOUR)
+
+    first.observe(X.iloc[:500], _ts(T0, 500))
+    second.observe(X.iloc[500:], _ts(T0 + HOUR, len(X) - 500))
+
+    assert DriftMonitor(baseline, "v1", window_seconds=HOUR).rows(windows=2, end=T0 + HOUR) == len(X)
+    assert (first.window_counts(windows=2, end=T0 + HOUR) == baseline["counts"]).all()
+    assert other_version.rows(windows=2, end=T0 + HOUR) == 0
+
+def test_monitor_log_drift_writes_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_DB_URI", f"sqlite:///{tmp_path / 'metrics.db'}")
+    monkeypatch.setattr(metrics_module, "METRICS_PATH", str(tmp_path / "metrics.json"))
+    X = _frame(n=200)
+    monitor = DriftMonitor(drift.fit_baseline(X))
+
+    assert monitor.log_drift("v1") is None
+    monitor.observe(X)
+    logged = monitor.log_drift("v1")
+
+    snapshot = metrics_module.load_metrics("v1")[-1]
+    assert snapshot["Drift_Window_Rows"] == 200
+    assert snapshot["PSI_Age"] == pytest.approx(logged["PSI_Age"])
+
+def test_new_records_feed_monitor_once_and_log_drift(tmp_path, monkeypatch):
+    from predict import predict_aura
+    from sklearn.linear_model import LogisticRegression
+    monkeypatch.setattr(metrics_module, "METRICS_DB_URI", f"sqlite:///{tmp_path / 'metrics.db'}")
+    monkeypatch.setattr(metrics_module, "METRICS_PATH", str(tmp_path / "metrics.json"))
+
+    X = _frame(n=400)
+    model = LogisticRegression().fit(X, X["Nausea"])
+    monitor = DriftMonitor(drift.fit_baseline(X))
+    new_rows = [X.assign(patient_id=range(len(X))), X.iloc[:0].assign(patient_id=[])]
+    monkeypatch.setattr(predict_aura, "run_incremental_pipeline", lambda: new_rows.pop(0))
+    monkeypatch.setattr(predict_aura, "load_active_model", lambda: model)
+    monkeypatch.setattr(predict_aura, "get_active_version", lambda: "v-drift")
+    monkeypatch.setattr(predict_aura, "get_monitor", lambda version, version_dir: monitor)
+
+    assert predict_aura.predict_new_records() == len(X.drop_duplicates())
+    # The watermark hands no rows over again, so the window is not re-counted
+    assert predict_aura.predict_new_records() == 0
+    assert monitor.rows() == len(X)
+
+    logged = metrics_module.load_metrics()["v-drift"]
+    assert logged[-1]["Drift_Window_Rows"] == len(X)
+    assert logged[-1]["PSI_Age"] == pytest.approx(0.0)
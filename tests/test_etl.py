@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+import pytest
 from etl.extract.extract import extract_dummy
 from etl.transform.transform import transform
 from etl.load import load as load_module
@@ -26,11 +27,246 @@ def test_transform_adds_missing_columns():
 def test_load_creates_file(tmp_path, monkeypatch):
     df = extract_dummy()
 
-    # Patch PROCESSED_DATA_PATH in the load module
+    # Patch the store and CSV paths in the load module
+    monkeypatch.setattr(load_module, "PROCESSED_STORE_PATH", str(tmp_path / "processed_ehr.parquet"))
     monkeypatch.setattr(load_module, "PROCESSED_DATA_PATH", tmp_path / "processed_ehr.csv")
 
-    # Call load
-    load_module.load(df)
+    # Call load with the optional CSV export
+    load_module.load(df, export=True)
 
-    # Assert the file exists
-    assert (tmp_path / "processed_ehr.csv").exists()
\ No newline at end of file
+    # Assert the files exist
+    assert load_module.store_exists()
+    assert (tmp_path / "processed_ehr.csv").exists()
+
+def test_processed_store_is_typed_and_filterable(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_module, "PROCESSED_STORE_PATH", str(tmp_path / "processed_ehr.parquet"))
+    df = transform(extract_dummy())
+    load_module.load(df.iloc[:2])
+    load_module.load(df.iloc[2:], append=True)
+
+    stored = load_module.read_processed()
+    assert stored["patient_id"].tolist() == [1, 2, 3, 4]
+    assert str(stored["Nausea"].dtype) == "int8"
+
+    subset = load_module.read_processed(columns=["patient_id", "Age"], filters=[("patient_id", "==", 3)])
+    assert subset.columns.tolist() == ["patient_id", "Age"]
+    assert subset["Age"].tolist() == [33]
+
+def test_appended_part_with_wider_values_reads_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_module, "PROCESSED_STORE_PATH", str(tmp_path / "processed_ehr.parquet"))
+    df = transform(extract_dummy())
+    first, second, third = df.iloc[:2].copy(), df.iloc[2:3].copy(), df.iloc[3:].copy()
+    first["Duration"] = [1, 2]
+    second["Duration"] = [300]
+    # A later part with a missing flag is stored nullable under the same Arrow type
+    third["Nausea"] = third["Nausea"].astype("float64")
+    third.loc[:, "Nausea"] = float("nan")
+
+    load_module.load(first)
+    load_module.load(second, append=True)
+    load_module.load(third, append=True)
+
+    stored = load_module.read_processed()
+    assert stored["Duration"].tolist()[:3] == [1, 2, 300]
+    assert stored["Nausea"].isna().tolist() == [False, False, False, True]
+
+def test_values_outside_storage_type_are_rejected_not_wrapped(tmp_path, monkeypatch):
+    from schemas.patient_features import SchemaValidationError
+    monkeypatch.setattr(load_module, "PROCESSED_STORE_PATH", str(tmp_path / "processed_ehr.parquet"))
+    df = transform(extract_dummy()).iloc[:3].copy()
+    df["Age"] = [300, -200, 40]
+    df["Duration"] = [1.5, 2, 3]
+
+    with pytest.raises(SchemaValidationError) as excinfo:
+        load_module.load(df)
+    assert excinfo.value.errors == {"Age": [0, 1], "Duration": [0]}
+    assert not load_module.store_exists()
+
+# -----------------------------
+# Test load_processed_data() cache
+# -----------------------------
+def _insert_patients(engine, patient_ids):
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        for pid in patient_ids:
+            conn.execute(text("INSERT INTO patient_records (patient_id, Age, Visual) VALUES (:pid, 30, 1)"), {"pid": pid})
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from data import init_db as init_db_module
+    from etl.extract import extract as extract_module
+
+    db_path = tmp_path / "patient_data.db"
+    engine = create_engine(f"sqlite:///{db_path}", future=True)
+    monkeypatch.setattr(init_db_module, "get_engine", lambda: engine)
+    monkeypatch.setattr(extract_module, "get_engine", lambda: engine)
+    monkeypatch.setattr(extract_module, "DB_PATH", str(db_path))
+    monkeypatch.setattr(extract_module, "WATERMARK_PATH", str(tmp_path / "extract_watermark.json"))
+    monkeypatch.setattr(load_module, "PROCESSED_STORE_PATH", str(tmp_path / "processed_ehr.parquet"))
+    init_db_module.init_db()
+    return engine
+
+def test_load_processed_data_refreshes_incrementally(temp_db, monkeypatch):
+    from etl.extract import extract as extract_module
+    from etl import run_pipeline as pipeline_module
+
+    engine = temp_db
+    pipeline_module.clear_pipeline_cache()
+
+    _insert_patients(engine, [1, 2])
+    first = pipeline_module.load_processed_data()
+    assert first["patient_id"].tolist() == [1, 2]
+    assert pipeline_module.load_processed_data() is first
+
+    extracted = []
+    real_extract_from_db = extract_module.extract_from_db
+    monkeypatch.setattr(pipeline_module, "extract_from_db",
+                        lambda min_id=None: extracted.append(min_id) or real_extract_from_db(min_id=min_id))
+    _insert_patients(engine, [3])
+    refreshed = pipeline_module.load_processed_data()
+
+    assert refreshed["patient_id"].tolist() == [1, 2, 3]
+    assert extracted == [2]
+    pipeline_module.clear_pipeline_cache()
+
+def test_snapshot_shared_between_processes(temp_db, tmp_path, monkeypatch):
+    from etl import run_pipeline as pipeline_module
+
+    monkeypatch.setattr(pipeline_module, "SNAPSHOT_PATH", str(tmp_path / "snapshot.arrow"))
+    pipeline_module.clear_pipeline_cache()
+    _insert_patients(temp_db, [1, 2])
+    first = pipeline_module.load_processed_data()
+    assert os.path.exists(tmp_path / "snapshot.arrow")
+    # Served from the mapped file, not a private copy
+    assert not first["Age"].to_numpy().flags.writeable
+
+    # Another process (fresh cache) on the same source maps the file instead of re-running the ETL
+    pipeline_module.clear_pipeline_cache()
+    real_refresh = pipeline_module._refresh
+    monkeypatch.setattr(pipeline_module, "_refresh", lambda cached, key: pytest.fail("ETL re-run"))
+    shared = pipeline_module.load_processed_data()
+    pd.testing.assert_frame_equal(shared, first)
+    assert pipeline_module.lookup_patient(2)["patient_id"].tolist() == [2]
+
+    # A new source key is not answered from the stale snapshot
+    monkeypatch.setattr(pipeline_module, "_refresh", real_refresh)
+    _insert_patients(temp_db, [3])
+    assert pipeline_module.load_processed_data()["patient_id"].tolist() == [1, 2, 3]
+    pipeline_module.clear_pipeline_cache()
+
+def test_snapshot_rebuilt_once_when_processes_race(temp_db, tmp_path, monkeypatch):
+    from etl import run_pipeline as pipeline_module
+
+    monkeypatch.setattr(pipeline_module, "SNAPSHOT_PATH", str(tmp_path / "snapshot.arrow"))
+    pipeline_module.clear_pipeline_cache()
+    _insert_patients(temp_db, [1, 2])
+    key = pipeline_module.source_key()
+    built = pipeline_module._refresh(None, key)
+
+    # Another process publishes the snapshot between this one's miss and its lock
+    real_from_snapshot = pipeline_module._from_snapshot
+    checks = []
+    def from_snapshot(key):
+        checks.append(key)
+        if len(checks) == 1:
+            pipeline_module.write_snapshot(built.df, pipeline_module.SNAPSHOT_PATH, {"source_key": list(key)})
+            return None
+        return real_from_snapshot(key)
+
+    monkeypatch.setattr(pipeline_module, "_from_snapshot", from_snapshot)
+    monkeypatch.setattr(pipeline_module, "_refresh", lambda cached, key: pytest.fail("ETL re-run"))
+    result = pipeline_module._refresh_shared(None, key)
+    assert len(checks) == 2
+    assert result.df["patient_id"].tolist() == [1, 2]
+    pipeline_module.clear_pipeline_cache()
+
+# -----------------------------
+# Test run_incremental_pipeline()
+# -----------------------------
+def test_incremental_pipeline_merges_only_new_rows(temp_db):
+    from etl.extract import extract as extract_module
+    from etl import run_pipeline as pipeline_module
+
+    _insert_patients(temp_db, [1, 2])
+    assert len(pipeline_module.run_incremental_pipeline()) == 2
+    assert extract_module.read_watermark()["id"] == 2
+
+    assert pipeline_module.run_incremental_pipeline().empty
+
+    _insert_patients(temp_db, [3])
+    assert pipeline_module.run_incremental_pipeline()["patient_id"].tolist() == [3]
+
+    processed = load_module.read_processed()
+    assert processed["patient_id"].tolist() == [1, 2, 3]
+    assert extract_module.read_watermark()["id"] == 3
+
+# -----------------------------
+# Test iter_pipeline() streaming
+# -----------------------------
+def test_iter_pipeline_streams_chunks(temp_db):
+    from etl.extract import extract as extract_module
+    from etl import run_pipeline as pipeline_module
+
+    _insert_patients(temp_db, [1, 2, 3, 4, 5])
+    sizes = [len(chunk) for chunk in pipeline_module.iter_pipeline(chunksize=2)]
+
+    assert sizes == [2, 2, 1]
+    processed = load_module.read_processed(columns=["patient_id"])
+    assert processed["patient_id"].tolist() == [1, 2, 3, 4, 5]
+    assert extract_module.read_watermark()["id"] == 5
+
+# -----------------------------
+# Test lookup_patient()
+# -----------------------------
+def test_lookup_patient_uses_index_and_latest_record(temp_db):
+    from sqlalchemy import text
+    from etl import run_pipeline as pipeline_module
+
+    _insert_patients(temp_db, [1, 2])
+    with temp_db.begin() as conn:
+        conn.execute(text("INSERT INTO patient_records (patient_id, Age, Visual) VALUES (1, 31, 0)"))
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM patient_records WHERE patient_id = 1 ORDER BY id DESC LIMIT 1"
+        )).fetchall()
+    assert "idx_patient_records_patient_id" in str(plan)
+
+    patient = pipeline_module.lookup_patient(1)
+    assert patient["Age"].tolist() == [31]
+    assert pipeline_module.lookup_patient(99).empty
+
+def test_lookup_patient_without_db_uses_cached_index(tmp_path, monkeypatch):
+    from etl.extract import extract as extract_module
+    from etl import run_pipeline as pipeline_module
+
+    monkeypatch.setattr(extract_module, "DB_PATH", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(extract_module, "CSV_PATH", str(tmp_path / "synthetic_ehr.csv"))
+    extract_dummy()
+    pipeline_module.clear_pipeline_cache()
+
+    assert pipeline_module.lookup_patient(3)["Age"].tolist() == [33]
+    assert pipeline_module.lookup_patient(99).empty
+    pipeline_module.clear_pipeline_cache()
+
+# -----------------------------
+# Test the database existence check
+# -----------------------------
+def test_database_check_follows_database_url(tmp_path):
+    import json
+    import subprocess
+    import sys
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    code = "import json; from etl.extract import extract as e; print(json.dumps([e.DB_PATH, e.db_exists()]))"
+
+    def check(url):
+        env = {**os.environ, "DATABASE_URL": url}
+        env.pop("DB_PATH", None)
+        result = subprocess.run([sys.executable, "-c", code], cwd=base_dir, env=env, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    other = tmp_path / "other.db"
+    assert check(f"sqlite:///{other}") == [str(other), False]
+    other.touch()
+    assert check(f"sqlite:///{other}") == [str(other), True]
+    # Server databases have no file to look for
+    assert check("postgresql://user@db-host/ehr") == [None, True]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import roc_auc_score
+from model import evaluation
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"Age": rng.integers(20, 70, 400), "Nausea": rng.integers(0, 2, 400)})
+    y = pd.Series((X["Nausea"] + rng.normal(0, 0.5, 400) > 0.5).astype(int))
+    return X, y
+
+# -----------------------------
+# Test split_dataset()
+# -----------------------------
+def test_split_is_deterministic_disjoint_and_cached(dataset):
+    X, y = dataset
+    split = evaluation.split_dataset(X, y)
+
+    assert split.held_out
+    parts = np.concatenate([split.train, split.validation, split.test])
+    assert sorted(parts) == list(range(len(X)))
+    assert len(split.test) == pytest.approx(0.2 * len(X), abs=1)
+    assert evaluation.split_dataset(X.copy(), y.copy()) is split
+
+def test_tiny_dataset_is_not_split():
+    X = pd.DataFrame({"Age": range(8)})
+    y = pd.Series([0, 1] * 4)
+    split = evaluation.split_dataset(X, y)
+
+    assert not split.held_out
+    assert split.test.tolist() == list(range(8))
+
+# -----------------------------
+# Test bootstrap_metrics()
+# -----------------------------
+def test_bootstrap_point_estimates_and_intervals():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 300)
+    y_prob = np.clip(y_true * 0.3 + rng.random(300) * 0.7, 0, 1).round(2)  # rounded: many ties
+    y_pred = (y_prob > 0.5).astype(int)
+
+    metrics = evaluation.bootstrap_metrics(y_true, y_pred, y_prob, n_boot=400)
+
+    assert metrics["AUC"] == pytest.approx(roc_auc_score(y_true, y_prob))
+    assert metrics["Accuracy"] == pytest.approx((y_true == y_pred).mean())
+    assert metrics["AUC_CI_Low"] < metrics["AUC"] < metrics["AUC_CI_High"]
+    assert metrics["Accuracy_CI_Low"] < metrics["Accuracy"] < metrics["Accuracy_CI_High"]
+    assert metrics["Test_Rows"] == 300
+
+def test_weighted_auc_matches_resampled_arrays():
+    rng = np.random.default_rng(2)
+    y_true = rng.integers(0, 2, 50)
+    y_prob = rng.random(50).round(1)
+    draws = rng.integers(0, 50, 50)
+    weights = np.bincount(draws, minlength=50)[None, :]
+
+    expected = roc_auc_score(y_true[draws], y_prob[draws])
+    assert evaluation._weighted_auc(y_true, y_prob, weights)[0] == pytest.approx(expected)
+
+def test_bootstrap_blocks_do_not_change_results(monkeypatch):
+    rng = np.random.default_rng(3)
+    y_true = rng.integers(0, 2, 100)
+    y_prob = rng.random(100)
+    y_pred = (y_prob > 0.5).astype(int)
+
+    full = evaluation.bootstrap_metrics(y_true, y_pred, y_prob, n_boot=200)
+    monkeypatch.setattr(evaluation, "BOOTSTRAP_BLOCK_CELLS", 700)
+    assert evaluation.bootstrap_metrics(y_true, y_pred, y_prob, n_boot=200) == full
+
+# -----------------------------
+# Test evaluate_model()
+# -----------------------------
+def test_evaluation_is_reused_for_unchanged_data(dataset, tmp_path):
+    from sklearn.linear_model import LogisticRegression
+    X, y = dataset
+    model = LogisticRegression().fit(X, y)
+
+    class CountingModel:
+        calls = 0
+        def predict(self, X):
+            CountingModel.calls += 1
+            return model.predict(X)
+        def predict_proba(self, X):
+            return model.predict_proba(X)
+
+    first = evaluation.evaluate_model(CountingModel(), X, y, str(tmp_path))
+    evaluation._evaluation_cache.clear()  # reloaded from evaluation.json
+    again = evaluation.evaluate_model(CountingModel(), X, y, str(tmp_path))
+
+    assert again == first
+    assert CountingModel.calls == 1
+    evaluation.evaluate_model(CountingModel(), X.iloc[:-1], y.iloc[:-1], str(tmp_path))
+    assert CountingModel.calls == 2
+
+def test_caches_keep_only_recent_entries(dataset, tmp_path, monkeypatch):
+    X, y = dataset
+    monkeypatch.setattr(evaluation, "SPLIT_CACHE_SIZE", 2)
+    evaluation._split_cache.clear()
+    first = evaluation.split_dataset(X, y)
+    evaluation.split_dataset(X.iloc[:-1], y.iloc[:-1])
+    assert evaluation.split_dataset(X, y) is first
+    evaluation.split_dataset(X.iloc[:-2], y.iloc[:-2])
+    # The least recently used split was dropped, the one just read was kept
+    assert len(evaluation._split_cache) == 2
+    assert evaluation.split_dataset(X, y) is first
+
+    monkeypatch.setattr(evaluation, "EVALUATION_CACHE_SIZE", 2)
+    for i in range(4):
+        evaluation.save_evaluation(str(tmp_path), f"fp{i}", {"AUC": i})
+    assert len(evaluation._evaluation_cache) == 2
+    assert evaluation.load_evaluation(str(tmp_path), "fp0") == {"AUC": 0}
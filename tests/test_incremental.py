@@ -0,0 +1,93 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from predict.linear_model import LinearScorer
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def online_env(tmp_path, monkeypatch):
+    """Temporary patient DB, model folder, registry and metrics store"""
+    from data.db import get_engine
+    from etl.extract import extract as extract_module
+    from predict import model_loader
+    from model import incremental, retrain, metrics
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'patient_data.db'}")
+    monkeypatch.setattr(extract_module, "get_engine", lambda: engine)
+    monkeypatch.setattr(extract_module, "DB_PATH", str(tmp_path / "patient_data.db"))
+
+    (tmp_path / "model").mkdir()
+    registry = str(tmp_path / "model" / "registry.json")
+    monkeypatch.setattr(model_loader, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry)
+    monkeypatch.setattr(retrain, "REGISTRY_PATH", registry)
+    monkeypatch.setattr(incremental, "MODEL_DIR", str(tmp_path / "model"))
+    monkeypatch.setattr(metrics, "METRICS_DB_URI", f"sqlite:///{tmp_path / 'metrics.db'}")
+    monkeypatch.setattr(metrics, "METRICS_PATH", str(tmp_path / "metrics.json"))
+
+    model_loader.clear_model_cache()
+    yield engine, tmp_path
+    model_loader.clear_model_cache()
+
+def _ingest(engine, n, seed):
+    from schemas.patient_features import COLUMN_MAP, ingest_ehr_dataframe
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.integers(0, 2, n) for col in COLUMN_MAP})
+    df["patient_id"] = np.arange(n) + seed * 1000
+    df["Age"] = rng.integers(20, 70, n)
+    df["Visual"] = ((df["Sensory"] + df["Nausea"]) > 0).astype(int)
+    ingest_ehr_dataframe(df, engine=engine)
+
+# -----------------------------
+# Test retrain_incremental()
+# -----------------------------
+def test_incremental_updates_track_new_records(online_env, monkeypatch):
+    from model import incremental
+    from predict.model_loader import get_active_version, load_active_model
+    engine, tmp_path = online_env
+
+    _ingest(engine, 300, seed=1)
+    # The active version has no online state: it is not silently replaced by a from-scratch fit
+    with pytest.raises(incremental.NoOnlineState):
+        incremental.retrain_incremental()
+    assert not (tmp_path / "model" / "registry.json").exists()
+
+    first = incremental.seed_online_model()
+    state = incremental.load_online_state(str(tmp_path / "model" / first))
+    assert state["n_seen"] == 300
+    assert get_active_version() == first
+
+    # No new rows: nothing is written
+    assert incremental.retrain_incremental() is None
+
+    # Only the new rows are read and fitted
+    _ingest(engine, 50, seed=2)
+    seen = []
+    original = incremental._training_frame
+    monkeypatch.setattr(incremental, "_training_frame", lambda raw: seen.append(len(raw)) or original(raw))
+    second = incremental.retrain_incremental()
+
+    assert seen == [50]
+    assert incremental.load_online_state(str(tmp_path / "model" / second))["n_seen"] == 350
+    registry = json.loads((tmp_path / "model" / "registry.json").read_text())
+    assert registry["versions"] == [first, second]
+    assert registry["active"] == second
+    # Served from the NumPy export written next to the pickle
+    assert isinstance(load_active_model(), LinearScorer)
+
+def test_folded_model_matches_scaled_sgd():
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.preprocessing import StandardScaler
+    from model.incremental import to_logistic_regression
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(50, 10, size=(200, 3)), columns=["Age", "Duration", "DPF"])
+    y = (X["Age"] > 50).astype(int)
+    scaler = StandardScaler().fit(X)
+    sgd = SGDClassifier(loss="log_loss", random_state=0).fit(scaler.transform(X), y)
+
+    model = to_logistic_regression(scaler, sgd, X.columns)
+    np.testing.assert_allclose(model.predict_proba(X), sgd.predict_proba(scaler.transform(X)), rtol=1e-9)
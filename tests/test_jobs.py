@@ -0,0 +1,141 @@
+import threading
+import pytest
+from model.jobs import JobRunner
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def runner():
+    runner = JobRunner(workers=1)
+    yield runner
+    runner.shutdown()
+
+def _blocking_job(started, release):
+    def fn(progress):
+        progress(0.1, "started")
+        started.set()
+        release.wait(5)
+        progress(0.9, "finishing")
+        return "v-new"
+    return fn
+
+# -----------------------------
+# Test JobRunner
+# -----------------------------
+def test_job_reports_progress_and_result(runner):
+    started, release = threading.Event(), threading.Event()
+    job = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+
+    assert started.wait(5)
+    assert job.to_dict()["status"] == "running"
+    assert job.progress == pytest.approx(0.1)
+
+    release.set()
+    job.future.result(5)
+    assert job.status == "succeeded"
+    assert job.result == "v-new"
+    assert runner.get(job.id) is job
+
+def test_same_dataset_is_not_retrained_twice_concurrently(runner):
+    started, release = threading.Event(), threading.Event()
+    first = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+    again = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+    other = runner.submit("retrain", _blocking_job(started, release), fingerprint="xyz")
+
+    assert again is first
+    assert other is not first
+
+    release.set()
+    first.future.result(5)
+    other.future.result(5)
+    # Once finished, the same dataset can be queued again
+    assert runner.submit("retrain", lambda progress: None, fingerprint="abc") is not first
+
+def test_cancel_running_and_queued_jobs(runner):
+    started, release = threading.Event(), threading.Event()
+    running = runner.submit("retrain", _blocking_job(started, release), fingerprint="a")
+    queued = runner.submit("retrain", _blocking_job(threading.Event(), release), fingerprint="b")
+    assert started.wait(5)
+
+    runner.cancel(queued.id)
+    runner.cancel(running.id)
+    assert queued.status == "cancelled"
+
+    release.set()
+    running.future.result(5)
+    assert running.status == "cancelled"
+    assert running.result is None
+
+def test_failed_job_records_error(runner):
+    def fail(progress):
+        raise ValueError("boom")
+
+    job = runner.submit("retrain", fail)
+    job.future.result(5)
+    assert job.status == "failed"
+    assert job.error == "boom"
+
+# -----------------------------
+# Test shared job state across workers
+# -----------------------------
+@pytest.fixture
+def other_worker():
+    runner = JobRunner(workers=1)
+    yield runner
+    runner.shutdown()
+
+def test_job_visible_and_cancellable_from_another_worker(runner, other_worker):
+    started, release = threading.Event(), threading.Event()
+    job = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+    assert started.wait(5)
+
+    seen = other_worker.get(job.id)
+    assert seen is not job
+    assert seen.status == "running"
+    assert seen.progress == pytest.approx(0.1)
+
+    other_worker.cancel(job.id)
+    release.set()
+    job.future.result(5)
+    assert job.status == "cancelled"
+    assert other_worker.get(job.id).status == "cancelled"
+    assert other_worker.get("unknown") is None
+
+def test_queued_job_cancelled_from_another_worker_never_starts(runner, other_worker):
+    started, release = threading.Event(), threading.Event()
+    running = runner.submit("retrain", _blocking_job(started, release), fingerprint="a")
+    queued = runner.submit("retrain", lambda progress: pytest.fail("started"), fingerprint="b")
+    assert started.wait(5)
+
+    assert other_worker.cancel(queued.id).status == "cancelled"
+    assert runner.get(queued.id).status == "cancelled"
+    release.set()
+    running.future.result(5)
+    queued.future.result(5)
+    assert queued.status == "cancelled"
+
+def test_same_dataset_is_not_retrained_twice_across_workers(runner, other_worker):
+    started, release = threading.Event(), threading.Event()
+    first = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+    again = other_worker.submit("retrain", lambda progress: pytest.fail("retrained twice"), fingerprint="abc")
+
+    assert again.id == first.id
+    assert again.future is None
+    release.set()
+    first.future.result(5)
+
+def test_job_of_exited_worker_does_not_block_retrain(runner, other_worker, monkeypatch):
+    from model import jobs
+    started, release = threading.Event(), threading.Event()
+    stuck = runner.submit("retrain", _blocking_job(started, release), fingerprint="abc")
+    assert started.wait(5)
+
+    # The worker that owned the job was killed mid-retrain
+    monkeypatch.setattr(jobs, "_owner_alive", lambda owner: False)
+    assert other_worker.get(stuck.id).status == "failed"
+    fresh = other_worker.submit("retrain", lambda progress: "v-new", fingerprint="abc")
+    assert fresh.id != stuck.id
+    assert fresh.future.result(5) is None
+    assert other_worker.get(fresh.id).result == "v-new"
+    release.set()
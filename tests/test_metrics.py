@@ -0,0 +1,98 @@
+import json
+import pytest
+from model import metrics as metrics_module
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def metrics_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_DB_URI", f"sqlite:///{tmp_path / 'metrics.db'}")
+    monkeypatch.setattr(metrics_module, "METRICS_PATH", str(tmp_path / "metrics.json"))
+    return tmp_path
+
+# -----------------------------
+# Test log_metrics() / load_metrics()
+# -----------------------------
+def test_log_and_load_metrics_round_trip(metrics_store):
+    metrics_module.log_metrics("v1", {"Accuracy": 0.9, "AUC": 0.95})
+    metrics_module.log_metrics("v2", {"Accuracy": 0.8, "PSI_Age": 0.1})
+
+    registry = metrics_module.load_metrics()
+    assert list(registry) == ["v1", "v2"]
+    assert list(registry["v1"][0]) == ["timestamp", "Accuracy", "AUC"]
+    assert registry["v2"][0]["PSI_Age"] == pytest.approx(0.1)
+    assert metrics_module.load_metrics("v3") == {}
+
+def test_legacy_metrics_json_is_imported(metrics_store):
+    legacy = {"v1": [{"timestamp": "2024-01-20T19:12:03", "Accuracy": 0.94}]}
+    (metrics_store / "metrics.json").write_text(json.dumps(legacy))
+
+    assert metrics_module.load_metrics() == legacy
+
+# -----------------------------
+# Test query_metrics()
+# -----------------------------
+def test_query_metrics_filters(metrics_store):
+    engine = metrics_module._store()
+    with engine.begin() as conn:
+        metrics_module._insert_snapshot(conn, "v1", "2024-01-01T00:00:00", {"Accuracy": 0.7, "AUC": 0.8})
+        metrics_module._insert_snapshot(conn, "v1", "2024-02-01T00:00:00", {"Accuracy": 0.75, "AUC": 0.85})
+        metrics_module._insert_snapshot(conn, "v2", "2024-02-02T00:00:00", {"Accuracy": 0.9})
+
+    rows = metrics_module.query_metrics(version="v1", start="2024-01-15", metrics=["AUC"])
+    assert rows == [{"version": "v1", "timestamp": "2024-02-01T00:00:00", "AUC": 0.85}]
+    assert len(metrics_module.query_metrics(end="2024-02-01T12:00:00")) == 2
+
+# -----------------------------
+# Test the materialized metrics view
+# -----------------------------
+def test_metrics_view_backfills_and_aggregates():
+    view = metrics_module.build_metrics_view({
+        "v1": [
+            {"timestamp": "t1", "Accuracy": 0.9, "PSI_Age": 0.3},
+            {"timestamp": "t2", "Accuracy": 0.8, "PSI_Age": 0.1},
+        ],
+        "v2": [{"timestamp": "t3", "AUC": 0.7}],
+    })
+
+    assert [list(row) for row in view.rows] == [["version", "timestamp", "Accuracy", "PSI_Age", "AUC"]] * 3
+    assert view.rows[0]["AUC"] == 0.0
+    assert view.latest["v1"]["timestamp"] == "t2"
+    assert view.max_psi_by_version == {"v1": 0.3, "v2": 0}
+    assert view.psi_values == {"PSI_Age": 0.0}
+    assert view.metric_options == ["AUC", "Accuracy", "PSI_Age"]
+
+def test_load_metrics_view_reads_only_new_snapshots(metrics_store, monkeypatch):
+    metrics_module.log_metrics("v1", {"Accuracy": 0.9})
+    first = metrics_module.load_metrics_view()
+    assert metrics_module.load_metrics_view() is first
+
+    fetched = []
+    real_fetch = metrics_module._fetch_snapshots
+    monkeypatch.setattr(metrics_module, "_fetch_snapshots",
+                        lambda **kw: fetched.append(kw) or real_fetch(**kw))
+    metrics_module.log_metrics("v1", {"Accuracy": 0.95, "PSI_Age": 0.2})
+    view = metrics_module.load_metrics_view()
+
+    assert fetched == [{"after_id": first.last_snapshot_id}]
+    assert len(view.rows) == 2
+    assert view.max_psi == pytest.approx(0.2)
+
+def test_load_metrics_view_rebuilds_after_store_is_recreated(metrics_store):
+    from sqlalchemy import text
+    metrics_module.log_metrics("v1", {"Accuracy": 0.9})
+    metrics_module.log_metrics("v1", {"Accuracy": 0.8})
+    assert len(metrics_module.load_metrics_view().rows) == 2
+
+    # metrics.db recreated: ids start over below the view's last snapshot id
+    engine = metrics_module._store()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE metric_values"))
+        conn.execute(text("DROP TABLE metric_snapshots"))
+    metrics_module._init_store(engine)
+    metrics_module.log_metrics("v2", {"AUC": 0.7})
+
+    view = metrics_module.load_metrics_view()
+    assert [row["version"] for row in view.rows] == ["v2"]
+    assert view.last_snapshot_id == 1
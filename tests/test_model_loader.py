@@ -8,6 +8,12 @@ from predict import model_loader
 # -----------------------------
 # Fixtures for temporary registry and model
 # -----------------------------
+@pytest.fixture(autouse=True)
+def fresh_model_cache():
+    model_loader.clear_model_cache()
+    yield
+    model_loader.clear_model_cache()
+
 @pytest.fixture
 def temp_registry_and_model():
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -71,11 +77,47 @@ def test_load_active_model_missing_file(monkeypatch):
         with open(registry_path, "w") as f:
             json.dump({"active": "v1"}, f)
         monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry_path)
+        monkeypatch.setattr(model_loader, "BASE_DIR", tmpdir)
         with pytest.raises(FileNotFoundError):
             model_loader.load_active_model()
 
-def test_load_active_model_legacy(monkeypatch):
+def test_load_active_model_legacy(monkeypatch, tmp_path):
     # Registry missing => default legacy
     monkeypatch.setattr(model_loader, "REGISTRY_PATH", "/non/existent/path.json")
+    monkeypatch.setattr(model_loader, "BASE_DIR", str(tmp_path))
     with pytest.raises(FileNotFoundError):
-        model_loader.load_active_model()
\ No newline at end of file
+        model_loader.load_active_model()
+
+# -----------------------------
+# Test the in-process model cache
+# -----------------------------
+def test_load_active_model_is_cached(temp_registry_and_model, monkeypatch):
+    tmpdir, registry_path, _, model = temp_registry_and_model
+    os.makedirs(os.path.join(tmpdir, "model", "v1"))
+    joblib.dump(model, os.path.join(tmpdir, "model", "v1", "logistic_model.joblib"))
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry_path)
+    monkeypatch.setattr(model_loader, "BASE_DIR", tmpdir)
+
+    calls = []
+    real_load = joblib.load
+    monkeypatch.setattr(model_loader.joblib, "load", lambda path: calls.append(path) or real_load(path))
+
+    first = model_loader.load_active_model()
+    assert model_loader.load_active_model() is first
+    assert len(calls) == 1
+
+def test_load_active_model_swaps_on_registry_change(temp_registry_and_model, monkeypatch):
+    tmpdir, registry_path, _, model = temp_registry_and_model
+    for version in ("v1", "v2"):
+        os.makedirs(os.path.join(tmpdir, "model", version))
+        joblib.dump(model, os.path.join(tmpdir, "model", version, "logistic_model.joblib"))
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry_path)
+    monkeypatch.setattr(model_loader, "BASE_DIR", tmpdir)
+
+    first = model_loader.load_active_model()
+    with open(registry_path, "w") as f:
+        json.dump({"active": "v2", "versions": ["v1", "v2"]}, f)
+
+    second = model_loader.load_active_model()
+    assert second is not first
+    assert model_loader.get_active_version() == "v2"
\ No newline at end of file
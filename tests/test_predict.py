@@ -0,0 +1,249 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from predict.scoring import validate_frame, score_frame
+
+FEATURES = ["Age", "Duration", "Nausea", "Vomit"]
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def cohort():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Age": rng.integers(18, 80, 500),
+        "Duration": rng.integers(0, 4, 500),
+        "Nausea": rng.integers(0, 2, 500),
+        "Vomit": rng.integers(0, 2, 500),
+    })
+    y = (df["Nausea"] + df["Vomit"] + rng.integers(0, 2, 500) > 1).astype(int)
+    model = LogisticRegression(max_iter=1000).fit(df[FEATURES], y)
+    return df, model
+
+# -----------------------------
+# Batch scoring
+# -----------------------------
+@pytest.mark.parametrize("chunk_size", [1, 7, 500, 10_000])
+def test_score_frame_matches_per_row(cohort, chunk_size):
+    df, model = cohort
+    X = validate_frame(df, FEATURES)
+    predictions, probabilities = score_frame(model, X, chunk_size=chunk_size)
+
+    expected_pred = [model.predict(X.iloc[[i]])[0] for i in range(len(X))]
+    expected_prob = [model.predict_proba(X.iloc[[i]])[0][1] for i in range(len(X))]
+
+    np.testing.assert_array_equal(predictions, expected_pred)
+    # Batched BLAS calls may differ from single-row calls in the last ulp
+    np.testing.assert_allclose(probabilities, expected_prob, rtol=1e-12)
+
+def test_validate_frame_rejects_fractional_values(cohort):
+    df, _ = cohort
+    df = df.astype(float)
+    df.loc[3, "Age"] = 30.5
+    with pytest.raises(ValueError, match="Age"):
+        validate_frame(df, FEATURES)
+
+# -----------------------------
+# NumPy linear export
+# -----------------------------
+def test_linear_export_matches_sklearn(cohort, tmp_path):
+    from predict.linear_model import export_linear_model, load_linear_model
+    df, model = cohort
+    X = validate_frame(df, FEATURES)
+
+    scorer = load_linear_model(export_linear_model(model, str(tmp_path)))
+
+    assert list(scorer.feature_names_in_) == FEATURES
+    np.testing.assert_allclose(scorer.predict_proba(X), model.predict_proba(X), rtol=1e-12)
+    np.testing.assert_array_equal(scorer.predict(X), model.predict(X))
+    np.testing.assert_array_equal(scorer.decision_function(X), model.decision_function(X))
+    # Columns are matched by name, not position
+    np.testing.assert_allclose(scorer.predict_proba(X[FEATURES[::-1]]), model.predict_proba(X), rtol=1e-12)
+
+def test_linear_scorer_probabilities_are_stable_at_extreme_scores():
+    from predict.linear_model import _expit
+    with np.errstate(over="raise"):
+        np.testing.assert_array_equal(_expit(np.array([-1000.0, 0.0, 1000.0])), [0.0, 0.5, 1.0])
+
+def test_linear_export_skips_non_linear_models(cohort, tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+    from predict.linear_model import export_linear_model
+    df, model = cohort
+    forest = RandomForestClassifier(n_estimators=2).fit(df[FEATURES], model.predict(df[FEATURES]))
+
+    assert export_linear_model(forest, str(tmp_path)) is None
+
+def test_loader_serves_linear_export(cohort, tmp_path, monkeypatch):
+    import joblib
+    from predict import model_loader
+    from predict.linear_model import LinearScorer, export_linear_model
+    df, model = cohort
+    version_dir = tmp_path / "model" / "v1"
+    version_dir.mkdir(parents=True)
+    joblib.dump(model, version_dir / "logistic_model.joblib")
+    (tmp_path / "model" / "registry.json").write_text('{"active": "v1"}')
+    monkeypatch.setattr(model_loader, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", str(tmp_path / "model" / "registry.json"))
+    model_loader.clear_model_cache()
+
+    assert isinstance(model_loader.load_active_model(), LogisticRegression)
+    export_linear_model(model, str(version_dir))
+    assert isinstance(model_loader.load_active_model(), LogisticRegression)  # cached until a change
+
+    model_loader.clear_model_cache()
+    served = model_loader.load_active_model()
+    assert isinstance(served, LinearScorer)
+    predictions, probabilities = score_frame(served, validate_frame(df, FEATURES))
+    np.testing.assert_allclose(probabilities, model.predict_proba(df[FEATURES])[:, 1], rtol=1e-12)
+
+    monkeypatch.setattr(model_loader, "MODEL_SERVING", "sklearn")
+    model_loader.clear_model_cache()
+    assert isinstance(model_loader.load_active_model(), LogisticRegression)
+    model_loader.clear_model_cache()
+
+# -----------------------------
+# Feature contributions
+# -----------------------------
+def test_cohort_contributions_match_per_patient(cohort):
+    from predict.feature_summary import feature_contributions, patient_feature_contribution
+    df, model = cohort
+    contributions = feature_contributions(model, df[FEATURES[::-1]])
+
+    for i in (0, 17, 499):
+        single = patient_feature_contribution(model, df.iloc[[i]]).set_index("Feature")["Contribution"]
+        np.testing.assert_allclose(single[FEATURES].to_numpy(), contributions[i])
+
+def test_top_contributors_are_largest_by_magnitude(cohort):
+    from predict.feature_summary import feature_contributions, top_contributors
+    df, model = cohort
+    contributions = feature_contributions(model, df)
+    idx, values = top_contributors(contributions, k=2)
+
+    assert idx.shape == values.shape == (len(df), 2)
+    expected = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :2]
+    np.testing.assert_array_equal(np.abs(values), np.take_along_axis(np.abs(contributions), expected, axis=1))
+    # k larger than the feature count is clipped
+    assert top_contributors(contributions, k=10)[0].shape == (len(df), len(FEATURES))
+
+def test_cohort_summary_and_memoized_global_summary(cohort):
+    from predict.feature_summary import cohort_contribution_summary, global_feature_summary, clear_summary_cache
+    df, model = cohort
+    summary = cohort_contribution_summary(model, df).set_index("Feature")
+    np.testing.assert_allclose(summary.loc["Age", "Mean_Contribution"], df["Age"].mean() * model.coef_[0][0])
+
+    clear_summary_cache()
+    first = global_feature_summary(model)
+    assert list(first.columns) == ["Feature", "Coefficient", "Odds_Ratio"]
+    assert global_feature_summary(model) is first
+
+    # Bounded: summaries of retired coefficient sets are dropped
+    from predict import feature_summary
+    for C in (0.01, 0.1, 10, 100, 1000):
+        global_feature_summary(LogisticRegression(C=C, max_iter=1000).fit(df[FEATURES], model.predict(df[FEATURES])))
+    assert len(feature_summary._summary_cache) == feature_summary.SUMMARY_CACHE_SIZE
+
+# -----------------------------
+# Prediction store
+# -----------------------------
+def test_cached_scores_only_score_new_records(cohort):
+    from predict.prediction_store import cached_scores
+    df, model = cohort
+    X = validate_frame(df, FEATURES)
+    expected_pred, expected_prob = score_frame(model, X)
+
+    pred, prob, contrib, n_scored = cached_scores(model, "v-test", X.iloc[:300], np.arange(300))
+    assert n_scored == len(X.iloc[:300].drop_duplicates())
+    np.testing.assert_array_equal(prob, expected_prob[:300])
+
+    # Second pass: the first 300 come from the store, only the rest are scored
+    pred, prob, contrib, n_scored = cached_scores(model, "v-test", X)
+    assert n_scored == len(X.drop_duplicates()) - len(X.iloc[:300].drop_duplicates())
+    np.testing.assert_array_equal(pred, expected_pred)
+    np.testing.assert_array_equal(prob, expected_prob)
+    np.testing.assert_allclose(contrib, X.to_numpy() * model.coef_[0])
+
+    assert cached_scores(model, "v-test", X)[3] == 0
+    # Another version does not reuse the first one's predictions
+    assert cached_scores(model, "v-other", X.iloc[:10])[3] == len(X.iloc[:10].drop_duplicates())
+
+def test_changed_record_is_rescored(cohort):
+    from predict.prediction_store import cached_scores, record_hashes
+    df, model = cohort
+    X = validate_frame(df, FEATURES).iloc[:5].copy()
+    cached_scores(model, "v-test", X)
+
+    X.iloc[0, 0] += 1
+    assert record_hashes(X)[0] != record_hashes(validate_frame(df, FEATURES))[0]
+    pred, prob, _, n_scored = cached_scores(model, "v-test", X)
+    assert n_scored == 1
+    np.testing.assert_array_equal(prob, score_frame(model, X)[1])
+
+# -----------------------------
+# predict_all()
+# -----------------------------
+def test_predict_all_stream_with_empty_source(cohort, monkeypatch):
+    from predict import predict_aura
+    _, model = cohort
+    monkeypatch.setattr(predict_aura, "load_active_model", lambda: model)
+    monkeypatch.setattr(predict_aura, "get_active_version", lambda: "v-empty")
+    monkeypatch.setattr(predict_aura, "iter_pipeline", lambda chunksize: iter([]))
+    monkeypatch.setattr(predict_aura, "log_metrics", lambda *args: pytest.fail("nothing to log"))
+
+    assert predict_aura.predict_all(stream=True) is None
+
+def test_predict_all_logs_a_run_once_without_touching_evaluations(cohort, tmp_path, monkeypatch):
+    from predict import predict_aura
+    df, model = cohort
+    df = df.assign(Visual=model.predict(df[FEATURES]), patient_id=range(len(df)))
+    logged = []
+    monkeypatch.setattr(predict_aura, "load_active_model", lambda: model)
+    monkeypatch.setattr(predict_aura, "get_active_version", lambda: "v-run")
+    monkeypatch.setattr(predict_aura, "version_dir", lambda version: str(tmp_path))
+    monkeypatch.setattr(predict_aura, "run_pipeline", lambda: df.copy())
+    monkeypatch.setattr(predict_aura, "PREDICTIONS_STORE_PATH", str(tmp_path / "predictions.parquet"))
+    monkeypatch.setattr(predict_aura, "log_metrics", lambda version, metrics: logged.append(metrics))
+
+    predict_aura.predict_all()
+    predict_aura.predict_all()
+    assert len(logged) == 1
+    # In-sample run metrics stay out of the held-out evaluations
+    assert not (tmp_path / "evaluation.json").exists()
+
+    monkeypatch.setattr(predict_aura, "run_pipeline", lambda: df.iloc[:-1].copy())
+    predict_aura.predict_all()
+    assert len(logged) == 2
+    assert json.loads((tmp_path / predict_aura.LOGGED_RUN_FILE).read_text()).keys() == {"fingerprint"}
+
+def test_prune_keeps_only_active_version(cohort):
+    from predict.prediction_store import cached_scores, prune_predictions
+    df, model = cohort
+    X = validate_frame(df, FEATURES).iloc[:20]
+    cached_scores(model, "v-old", X)
+    cached_scores(model, "v-new", X)
+
+    assert prune_predictions(["v-new"]) == len(X.drop_duplicates())
+    assert cached_scores(model, "v-new", X)[3] == 0
+    assert cached_scores(model, "v-old", X)[3] == len(X.drop_duplicates())
+
+def test_model_replaced_in_place_drops_its_cached_predictions(cohort, tmp_path):
+    import joblib
+    from model.save_pretrained_model import ensure_model
+    from predict.prediction_store import cached_scores
+    df, model = cohort
+    X = validate_frame(df, FEATURES).iloc[:20]
+    joblib.dump(model, tmp_path / "logistic_model.pkl")
+    ensure_model(model_dir=str(tmp_path))
+    cached_scores(model, "v1", X)
+
+    # A restart with the same model file keeps the cache
+    ensure_model(model_dir=str(tmp_path))
+    assert cached_scores(model, "v1", X)[3] == 0
+
+    # A new logistic_model.pkl overwrites v1 in place: its old scores are not served
+    retrained = LogisticRegression(C=0.01, max_iter=1000).fit(X, df["Nausea"].iloc[:20])
+    joblib.dump(retrained, tmp_path / "logistic_model.pkl")
+    ensure_model(model_dir=str(tmp_path))
+    assert cached_scores(retrained, "v1", X)[3] == len(X.drop_duplicates())
@@ -0,0 +1,93 @@
+import os
+import json
+import threading
+import pytest
+from model import registry
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "registry.json")
+
+# -----------------------------
+# Test register_version() / update_registry()
+# -----------------------------
+def test_register_version_writes_atomically_and_bumps_revision(registry_path):
+    token = registry.change_token(registry_path)
+    registry.register_version("v1", artifacts={"logistic_model.joblib": "abc"}, path=registry_path)
+    after_first = registry.change_token(registry_path)
+    registry.register_version("v2", path=registry_path)
+
+    data = registry.read_registry(registry_path)
+    assert data["active"] == "v2"
+    assert data["versions"] == ["v1", "v2"]
+    assert data["artifacts"] == {"v1": {"logistic_model.joblib": "abc"}}
+    assert data["revision"] == 2
+    assert len({token, after_first, registry.change_token(registry_path)}) == 3
+    assert not [f for f in os.listdir(os.path.dirname(registry_path)) if f.endswith(".tmp")]
+
+def test_unchanged_registration_does_not_rewrite(registry_path):
+    registry.register_version("v1", artifacts={"m": "abc"}, path=registry_path)
+    token = registry.change_token(registry_path)
+
+    registry.register_version("v1", artifacts={"m": "abc"}, path=registry_path)
+    assert registry.change_token(registry_path) == token
+
+def test_concurrent_registrations_are_not_lost(registry_path):
+    threads = [
+        threading.Thread(target=registry.register_version, args=(f"v{i}",), kwargs={"path": registry_path})
+        for i in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    data = registry.read_registry(registry_path)
+    assert sorted(data["versions"]) == sorted(f"v{i}" for i in range(20))
+    assert data["revision"] == 20
+
+def test_read_registry_tolerates_missing_or_corrupt_file(registry_path):
+    assert registry.read_registry(registry_path) == {}
+    with open(registry_path, "w") as f:
+        f.write("{not json")
+    assert registry.read_registry(registry_path) == {}
+
+# -----------------------------
+# Test artifacts and version ids
+# -----------------------------
+def test_install_artifact_skips_identical_content(tmp_path):
+    src = tmp_path / "model.pkl"
+    src.write_bytes(b"model-bytes")
+    dest = str(tmp_path / "v1" / "logistic_model.joblib")
+
+    digest, copied = registry.install_artifact(str(src), dest)
+    assert copied
+    mtime = os.stat(dest).st_mtime_ns
+
+    assert registry.install_artifact(str(src), dest) == (digest, False)
+    assert os.stat(dest).st_mtime_ns == mtime
+
+    src.write_bytes(b"retrained")
+    assert registry.install_artifact(str(src), dest)[1] is True
+
+def test_new_version_dirs_never_collide(tmp_path):
+    versions = {registry.new_version_dir(str(tmp_path))[0] for _ in range(50)}
+    assert len(versions) == 50
+    assert sorted(os.listdir(tmp_path)) == sorted(versions)
+
+# -----------------------------
+# Loader polls the change token
+# -----------------------------
+def test_loader_sees_active_version_change(registry_path, monkeypatch):
+    from predict import model_loader
+    monkeypatch.setattr(model_loader, "REGISTRY_PATH", registry_path)
+    model_loader.clear_model_cache()
+
+    registry.register_version("v1", path=registry_path)
+    assert model_loader.get_active_version() == "v1"
+    registry.register_version("v2", path=registry_path)
+    assert model_loader.get_active_version() == "v2"
+    model_loader.clear_model_cache()
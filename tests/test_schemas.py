@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+from schemas.patient_features import (
+    COLUMN_CONSTRAINTS,
+    SchemaValidationError,
+    find_invalid_rows,
+    validate_columns,
+    validate_record,
+)
+
+# -----------------------------
+# Constraints come from PatientFeatures
+# -----------------------------
+def test_constraints_follow_patient_features():
+    assert COLUMN_CONSTRAINTS["Age"] == {"ge": 0, "le": 120, "required": True, "default": None}
+    assert COLUMN_CONSTRAINTS["Type_Other"]["le"] == 1
+    assert "Type_Migraine without aura" in COLUMN_CONSTRAINTS
+
+# -----------------------------
+# Columnar validation
+# -----------------------------
+def test_find_invalid_rows_reports_indices_per_field():
+    df = pd.DataFrame({
+        "Age": [25, 130, 40, -1],
+        "Nausea": [0, 1, 2, 1],
+        "Duration": [1.0, 2.5, 3.0, None],
+    }, index=[10, 11, 12, 13])
+
+    errors = find_invalid_rows(df, ["Age", "Nausea", "Duration"])
+    assert errors == {"Age": [11, 13], "Nausea": [12], "Duration": [11, 13]}
+
+def test_validate_columns_fills_defaults_and_casts():
+    df = pd.DataFrame({"Age": [25.0, 47.0]})
+    validated = validate_columns(df, ["Age", "Vomit"])
+    assert validated["Age"].dtype == "int64"
+    assert validated["Vomit"].tolist() == [0, 0]
+
+def test_validate_columns_requires_required_fields():
+    with pytest.raises(SchemaValidationError) as exc:
+        validate_columns(pd.DataFrame({"Nausea": [1]}), ["Age", "Nausea"])
+    assert exc.value.errors == {"Age": [0]}
+
+# -----------------------------
+# Single-record validation
+# -----------------------------
+def test_validate_record_keeps_dataset_column_names():
+    record = validate_record({"Age": 30, "Type_Migraine without aura": 1})
+    assert record["Type_Migraine without aura"] == 1
+    assert record["Nausea"] == 0
+
+# -----------------------------
+# Bulk ingestion
+# -----------------------------
+def test_ingest_ehr_dataframe_bulk_inserts_in_batches(tmp_path):
+    import numpy as np
+    from sqlalchemy import text
+    from data.db import get_engine
+    from schemas.patient_features import COLUMN_MAP, ingest_ehr_dataframe
+    from etl.transform.transform import transform
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'patient_data.db'}")
+    n = 2_500
+    df = pd.DataFrame({col: np.zeros(n, dtype=int) for col in COLUMN_MAP})
+    df["patient_id"] = np.arange(n)
+    df["Age"] = 40
+    df["Type_Migraine without aura"] = "1"  # strings are coerced too
+
+    report = ingest_ehr_dataframe(df, batch_size=1_000, engine=engine)
+    assert report["rows"] == n
+    assert report["batches"] == 3
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        stored = pd.read_sql("SELECT * FROM patient_records ORDER BY id", conn)
+
+    assert len(stored) == n
+    assert transform(stored)["Type_Migraine without aura"].eq(1).all()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from model import save_best_model
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+@pytest.fixture
+def training_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.integers(0, 3, size=(200, 4)), columns=["Age", "Nausea", "Vomit", "DPF"])
+    y = pd.Series((X["Nausea"] + rng.normal(0, 0.7, 200) > 1).astype(int), name="Visual")
+    return X, y
+
+# -----------------------------
+# Test cv_splits()
+# -----------------------------
+def test_cv_splits_are_cached_per_dataset(training_data):
+    X, y = training_data
+    splits = save_best_model.cv_splits(X, y)
+
+    assert len(splits) == save_best_model.CV_FOLDS
+    assert save_best_model.cv_splits(X.copy(), y.copy()) is splits
+    assert save_best_model.cv_splits(X.iloc[:-1], y.iloc[:-1]) is not splits
+
+# -----------------------------
+# Test search_candidates() / fit_best()
+# -----------------------------
+def test_leaderboard_covers_every_candidate_path(training_data):
+    X, y = training_data
+    leaderboard = save_best_model.search_candidates(X, y, n_jobs=1)
+
+    expected = sum(len(spec["path"][1]) for spec in save_best_model.CANDIDATES.values())
+    assert len(leaderboard) == expected
+    assert leaderboard["mean_f1"].is_monotonic_decreasing
+    assert leaderboard.columns.tolist() == ["candidate", "param", "value", "mean_f1", "std_f1", "linear"]
+
+def test_search_reuses_bounded_fold_cache_and_linear_candidates_are_deployable(training_data, monkeypatch):
+    X, y = training_data
+    save_best_model._fold_cache.clear()
+    leaderboard = save_best_model.search_candidates(X, y, candidates=save_best_model.LINEAR_CANDIDATES, n_jobs=1)
+    splits = save_best_model.cv_splits(X, y)
+
+    # A second search of the same dataset reuses its fold indices
+    assert len(save_best_model._fold_cache) == 1
+    save_best_model.search_candidates(X, y, candidates=["logistic"], n_jobs=1)
+    assert save_best_model.cv_splits(X, y) is splits
+    assert "random_forest" not in save_best_model.LINEAR_CANDIDATES
+    assert leaderboard["linear"].all()
+
+    # Only the most recently used datasets are kept
+    monkeypatch.setattr(save_best_model, "FOLD_CACHE_SIZE", 2)
+    save_best_model.cv_splits(X.iloc[:-1], y.iloc[:-1])
+    save_best_model.cv_splits(X, y)
+    save_best_model.cv_splits(X.iloc[:-2], y.iloc[:-2])
+    assert len(save_best_model._fold_cache) == 2
+    assert save_best_model.cv_splits(X, y) is splits
+
+def test_parallel_search_matches_serial(training_data):
+    X, y = training_data
+    serial = save_best_model.search_candidates(X, y, candidates=["logistic"], n_jobs=1)
+    parallel = save_best_model.search_candidates(X, y, candidates=["logistic"], n_jobs=2)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+def test_warm_started_path_matches_cold_fits(training_data):
+    X, y = training_data
+    train_idx, test_idx = save_best_model.cv_splits(X, y)[0]
+    warm = save_best_model._fit_path("logistic", 0, X, y, train_idx, test_idx)
+
+    for _, _, C, f1 in warm:
+        cold = LogisticRegression(max_iter=1000, C=C).fit(X.iloc[train_idx], y.iloc[train_idx])
+        assert f1 == pytest.approx(f1_score(y.iloc[test_idx], cold.predict(X.iloc[test_idx])), abs=0.02)
+
+def test_fit_best_deploys_only_linear_candidates(training_data):
+    X, y = training_data
+    leaderboard = pd.DataFrame([
+        {"candidate": "random_forest", "param": "n_estimators", "value": 100.0, "mean_f1": 0.9, "std_f1": 0.0, "linear": False},
+        {"candidate": "logistic", "param": "C", "value": 10.0, "mean_f1": 0.8, "std_f1": 0.0, "linear": True},
+    ])
+    model = save_best_model.fit_best(X, y, leaderboard)
+
+    assert isinstance(model, LogisticRegression)
+    assert model.C == 10
+    assert model.warm_start is False
@@ -1,22 +1,30 @@
-from flask import Flask, flash,render_template, request, redirect, url_for, session
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, flash,render_template, request, redirect, url_for, session, jsonify
 from markupsafe import Markup
 import sys, os
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
-import plotly.express as px
 import uuid
+import json
+import numpy as np
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(BASE_DIR)
 
-from etl.run_pipeline import run_pipeline
-from schemas.patient_features import ingest_ehr_dataframe
-from predict.model_loader import load_active_model, get_active_version
-from predict.feature_summary import global_feature_summary, patient_feature_contribution
-from model.metrics import load_metrics
-from model.retrain import retrain_model
-from model import save_pretrained_model
+from etl.run_pipeline import load_processed_data, lookup_patient
+from schemas.patient_features import ingest_ehr_dataframe, validate_columns, SchemaValidationError, FIELD_TO_COLUMN
+from predict.scoring import score_frame
+from predict.prediction_store import cached_scores
+from predict.model_loader import load_active_model, get_active_version, version_dir
+from predict.feature_summary import (
+    global_feature_summary, patient_feature_contribution, contribution_frame, feature_contributions, top_contributors,
+)
+from model.metrics import load_metrics_view
+from model.drift_monitor import get_monitor
+from model.jobs import submit_retrain, submit_incremental_retrain, get_job, cancel_job
 from model.save_pretrained_model import ensure_model
 
 # Path to the versioned model
@@ -26,69 +34,51 @@ REGISTRY_FILE = os.path.join(BASE_DIR, "model", "registry.json")
 
 
 load_dotenv()
-app = Flask(__name__)
-app.secret_key = os.getenv("FLASK_SECRET_KEY", "supersecretkey")
 
 # Admin credentials
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "password123")
 
-try:
-    # Trains model if missing, ensures v1 + legacy folders, updates registry.json
-    ensure_model(MODEL_VERSION)
-except Exception as e:
-    print("Error during model setup:", e)
-    raise e
+# Batch prediction API: optional bearer token and per-request record limit
+API_TOKEN = os.getenv("API_TOKEN")
+API_MAX_RECORDS = int(os.getenv("API_MAX_RECORDS", 10_000))
+
+# Seconds create_app (including startup work) may take; exceeding it is logged
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 3.0))
 
-# Now safe to load active model
-try:
-    model = load_active_model()
-    active_version = get_active_version()
-    print(f"Active model version loaded: {active_version}")
-except FileNotFoundError as e:
-    print("Failed to load active model:", e)
-    raise e
 
-@app.route("/metrics")
 def metrics():
     is_admin = session.get("is_admin", False)
     if not is_admin:
         return redirect(url_for("index"))
 
-    metrics_table = []
-    max_psi = 0
-    metrics_registry = load_metrics()
-    psi_values = {}
-    if metrics_registry:
-        for version, snapshots in metrics_registry.items():
-            for snap in snapshots:
-                row = {"version": version, **snap}
-                metrics_table.append(row)
-                psi_keys = [k for k in snap.keys() if k.startswith("PSI_")]
-                if psi_keys:
-                    max_psi = max(max_psi, max(snap[k] for k in psi_keys))
+    view = load_metrics_view()
 
     return render_template(
         "metrics.html",
-        metrics_table=metrics_table,
-        max_psi=max_psi,
-        metrics_available=bool(metrics_table),
-        metric_options=[k for k in metrics_table[0].keys() if k not in ("timestamp", "version")] if metrics_table else [],
+        metrics_table=view.rows,
+        max_psi=view.max_psi,
+        metrics_available=bool(view.rows),
+        metric_options=view.metric_options,
         metrics_chart=None,
-        psi_values=psi_values,
+        psi_values={},
         is_admin=is_admin
     )
 
-@app.route("/", methods=["GET", "POST"])
 def index():
     is_admin = session.get("is_admin", False)
 
-    # --- Always load processed_df ---
-    processed_df = run_pipeline()
+    # --- Cached processed_df (re-extracted only when the source changes) ---
+    processed_df = load_processed_data()
 
-    # --- Retrain model if requested ---
+    # --- Retrain model in the background if requested ---
     if request.method == "POST" and is_admin and request.form.get("retrain"):
-        retrain_model(processed_df)
+        if request.form.get("retrain") == "incremental":
+            job = submit_incremental_retrain()
+        else:
+            job = submit_retrain(processed_df)
+        session["retrain_job"] = job.id
+    retrain_job = get_job(session.get("retrain_job")) if is_admin else None
 
     # --- Load active model & version ---
     model = load_active_model()
@@ -106,12 +96,17 @@ def index():
     if patient_id is not None:
         patient_id = int(patient_id)
         session["selected_patient"] = patient_id
-        patient_row = processed_df[processed_df["patient_id"] == patient_id]
+        patient_row = lookup_patient(patient_id)
         if not patient_row.empty:
             X_patient = patient_row[FEATURE_COLS]
-            prediction = model.predict(X_patient)[0]
-            probability = model.predict_proba(X_patient)[0][1]
-            feature_contrib = patient_feature_contribution(model, X_patient)
+            # Lookup in the prediction store; scored (and stored) only if this record is new to the version
+            predictions, probabilities, contributions, _ = cached_scores(model, active_version, X_patient, patient_row["patient_id"])
+            prediction, probability = predictions[0], probabilities[0]
+            if contributions is not None:
+                # Stored with the prediction, so a cached record is not recomputed
+                feature_contrib = contribution_frame(model.feature_names_in_, contributions[0])
+            else:
+                feature_contrib = patient_feature_contribution(model, X_patient)
 
     global_feature_imp = global_feature_summary(model)
 
@@ -124,33 +119,15 @@ def index():
     psi_values = {}
 
     if is_admin:
-        metrics_registry = load_metrics()
-        all_keys = set()
-        if metrics_registry:
-            for version, snapshots in metrics_registry.items():
-                for snap in snapshots:
-                    row = {"version": version, **snap}
-                    metrics_table.append(row)
-                    all_keys.update(row.keys())
-
-            metrics_available = bool(metrics_table)
-            all_psi_keys = sorted([k for k in all_keys if k.startswith("PSI_")])
-            for version, snapshots in metrics_registry.items():
-                last_snap = snapshots[-1]
-                for k in all_psi_keys:
-                    psi_values[k] = last_snap.get(k, 0.0)
-            max_psi = max(psi_values.values()) if psi_values else 0
-
-            for row in metrics_table:
-                for key in all_keys:
-                    if key not in row:
-                        row[key] = 0.0
-            
-            metric_options = sorted(
-                k for k in all_keys
-                if k not in ("timestamp", "version")
-            )
-
+        # Pre-aggregated view: only snapshots logged since the last request are read
+        view = load_metrics_view()
+        metrics_table = view.rows
+        metrics_available = bool(metrics_table)
+        psi_values = view.psi_values
+        max_psi = max(psi_values.values()) if psi_values else 0
+        metric_options = view.metric_options
+
+        if metrics_available:
             metric_to_plot = (
                 request.args.get("metric")
                 or request.form.get("metric")
@@ -159,21 +136,17 @@ def index():
             if metric_to_plot not in metric_options:
                 metric_to_plot = metric_options[0]
 
-            df = pd.DataFrame(metrics_table)
-
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-
-            df[metric_to_plot] = pd.to_numeric(
-                df[metric_to_plot],
-                errors="coerce"
-            )
+            df = pd.DataFrame({
+                "timestamp": pd.to_datetime([row["timestamp"] for row in metrics_table], errors="coerce"),
+                "version": [row["version"] for row in metrics_table],
+                metric_to_plot: pd.to_numeric([row[metric_to_plot] for row in metrics_table], errors="coerce"),
+            })
 
             df = df.sort_values("timestamp")
-            print("Metric to plot:", metric_to_plot)
-            print(df[metric_to_plot].head(10))
-            print(df[metric_to_plot].dtype)
             plot_id = f"plot_{uuid.uuid4().hex}"
 
+            # plotly is only needed for the admin chart
+            import plotly.express as px
             fig = px.line(
                 df,
                 x="timestamp",
@@ -215,9 +188,122 @@ def index():
         admin_password=ADMIN_PASSWORD,
         metric_options=metric_options,
         metrics_chart=Markup(metrics_chart) if metrics_chart else None,
+        retrain_job=retrain_job,
     )
 
-@app.route("/login", methods=["POST"])
+def retrain():
+    if not session.get("is_admin", False):
+        return jsonify({"error": "Admin login required"}), 403
+
+    if request.args.get("mode") == "incremental":
+        job = submit_incremental_retrain()
+    else:
+        job = submit_retrain(load_processed_data())
+    session["retrain_job"] = job.id
+    return jsonify(job.to_dict()), 202
+
+def job_status(job_id):
+    if not session.get("is_admin", False):
+        return jsonify({"error": "Admin login required"}), 403
+
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+def job_cancel(job_id):
+    if not session.get("is_admin", False):
+        return jsonify({"error": "Admin login required"}), 403
+
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+def _parse_records():
+    """Records from a JSON body (list, or {"records": [...]}) or an NDJSON body"""
+    body = request.get_data(as_text=True)
+    if request.mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    payload = json.loads(body) if body.strip() else None
+    if isinstance(payload, dict):
+        payload = payload.get("records")
+    if not isinstance(payload, list):
+        raise ValueError('Expected a JSON list of records or {"records": [...]}')
+    return payload
+
+def _observe_drift(version, X):
+    """Count scored API records toward the version's shared drift windows"""
+    try:
+        monitor = get_monitor(version, version_dir(version))
+        if monitor is not None:
+            monitor.observe(X)
+    except Exception as e:
+        # Drift bookkeeping never fails a prediction
+        print("Drift window update failed:", e)
+
+def api_predict():
+    """Score a batch of patient feature records in one vectorized call"""
+    if API_TOKEN and request.headers.get("Authorization") != f"Bearer {API_TOKEN}":
+        return jsonify({"error": "Invalid or missing API token"}), 401
+
+    try:
+        records = _parse_records()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
+    if len(records) > API_MAX_RECORDS:
+        return jsonify({"error": f"At most {API_MAX_RECORDS} records per request"}), 413
+    if not records or not all(isinstance(r, dict) for r in records):
+        return jsonify({"error": "Records must be a non-empty list of objects"}), 400
+
+    model = load_active_model()
+    feature_cols = list(model.feature_names_in_)
+
+    # Underscore field names (PatientFeatures) and dataset column names are both accepted
+    df = pd.DataFrame.from_records(records).rename(columns=FIELD_TO_COLUMN)
+    try:
+        X = validate_columns(df, feature_cols)
+    except SchemaValidationError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 422
+
+    include_contributions = request.args.get("contributions", "1") != "0"
+    top_k = request.args.get("top_k")
+    if top_k is not None:
+        if not top_k.isdigit() or int(top_k) < 1:
+            return jsonify({"error": "top_k must be a positive integer"}), 400
+        top_k = int(top_k)
+
+    predictions, probabilities = score_frame(model, X)
+    _observe_drift(get_active_version(), X)
+    contributions = None
+    if include_contributions:
+        contrib = feature_contributions(model, X)
+        if top_k:
+            # Only the k strongest contributors per record
+            idx, values = top_contributors(contrib, top_k)
+            names = np.asarray(feature_cols, dtype=object)[idx].tolist()
+            contributions = [dict(zip(n, v)) for n, v in zip(names, values.tolist())]
+        else:
+            contributions = [dict(zip(feature_cols, row)) for row in contrib.tolist()]
+
+    if "patient_id" in df.columns:
+        patient_ids = df["patient_id"].astype(object).where(df["patient_id"].notna(), None).tolist()
+    else:
+        patient_ids = [None] * len(df)
+    results = []
+    for i, (pid, pred, prob) in enumerate(zip(patient_ids, predictions.tolist(), probabilities.tolist())):
+        result = {"patient_id": pid, "prediction": pred, "probability": prob}
+        if contributions is not None:
+            result["contributions"] = contributions[i]
+        results.append(result)
+
+    return jsonify({
+        "model_version": get_active_version(),
+        "count": len(results),
+        "predictions": results,
+    })
+
 def login():
     username = request.form.get("username")
     password = request.form.get("password")
@@ -225,11 +311,64 @@ def login():
         session["is_admin"] = True
     return redirect(url_for("index"))
 
-@app.route("/logout")
 def logout():
     session["is_admin"] = False
     return redirect(url_for("index"))
 
+def _register_routes(app):
+    app.add_url_rule("/metrics", view_func=metrics)
+    app.add_url_rule("/", view_func=index, methods=["GET", "POST"])
+    app.add_url_rule("/retrain", view_func=retrain, methods=["POST"])
+    app.add_url_rule("/jobs/<job_id>", view_func=job_status)
+    app.add_url_rule("/jobs/<job_id>/cancel", view_func=job_cancel, methods=["POST"])
+    app.add_url_rule("/api/predict", view_func=api_predict, methods=["POST"])
+    app.add_url_rule("/login", view_func=login, methods=["POST"])
+    app.add_url_rule("/logout", view_func=logout)
+
+def _startup():
+    """Make sure a model is in place and warm the loader cache (no writes when artifacts are current)"""
+    try:
+        # Trains model if missing, ensures v1 + legacy folders, updates registry.json
+        ensure_model(MODEL_VERSION)
+    except Exception as e:
+        print("Error during model setup:", e)
+        raise e
+
+    try:
+        load_active_model()
+        print(f"Active model version loaded: {get_active_version()}")
+    except FileNotFoundError as e:
+        print("Failed to load active model:", e)
+        raise e
+
+def create_app(config=None, startup=True):
+    """Application factory. sklearn and plotly are imported on first use, not here."""
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.secret_key = os.getenv("FLASK_SECRET_KEY", "supersecretkey")
+    app.config.update(config or {})
+    _register_routes(app)
+
+    if startup:
+        _startup()
+
+    elapsed = time.perf_counter() - started
+    app.config["STARTUP_SECONDS"] = elapsed
+    app.config["IMPORT_SECONDS"] = IMPORT_SECONDS
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        app.logger.warning("Startup took %.2fs, over the %.2fs budget", elapsed, STARTUP_BUDGET_SECONDS)
+    else:
+        print(f"App ready in {elapsed:.2f}s (module import {IMPORT_SECONDS:.2f}s)")
+    return app
+
+# Time spent importing this module and its dependencies
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# Importing only registers the routes; the dev server below and webapp/wsgi.py
+# run the startup work (ensure_model, model load) through create_app()
+app = create_app(startup=False)
+
 if __name__ == "__main__":
+    app = create_app()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
\ No newline at end of file
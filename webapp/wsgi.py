@@ -0,0 +1,65 @@
+"""Prefork WSGI entry point: gunicorn webapp.wsgi:app (settings in gunicorn.conf.py).
+
+The model and the processed dataset are loaded once in the master before it
+forks, so workers share them copy-on-write; the dataset also lives in a
+memory-mapped Arrow snapshot that workers reuse after a source change.
+Importing this module does no work: `app` is built on first access.
+"""
+import os
+import sys
+import threading
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+# Used when PIPELINE_SNAPSHOT_PATH is not set
+DEFAULT_SNAPSHOT_PATH = os.path.join(BASE_DIR, "data", "processed", "pipeline_snapshot.arrow")
+# Set to 0 to skip loading the dataset in the master
+WSGI_PRELOAD_DATA = os.getenv("WSGI_PRELOAD_DATA", "1") == "1"
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def preload():
+    """Load the processed dataset (and write its snapshot) before workers fork"""
+    from etl.run_pipeline import load_processed_data
+    df = load_processed_data()
+    print(f"Preloaded {len(df)} processed rows")
+
+def get_app():
+    """The served app, built once: ensure_model, model load and (optionally) the dataset preload"""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                from etl import run_pipeline
+                from webapp.app import create_app
+                if not run_pipeline.SNAPSHOT_PATH:
+                    run_pipeline.SNAPSHOT_PATH = DEFAULT_SNAPSHOT_PATH
+                app = create_app()
+                if WSGI_PRELOAD_DATA:
+                    preload()
+                _app = app
+    return _app
+
+def post_fork_reset():
+    """Drop per-process state a worker must not inherit from the master.
+
+    Pooled DB connections are left open for the master (close=False) and
+    rebuilt lazily; the job runner's threads do not exist after fork. The
+    model and dataset caches are kept: they are what the workers share, and
+    registry changes still reach every worker through the change token.
+    """
+    from data.db import dispose_engines
+    from model.drift_monitor import clear_monitors
+    from model.jobs import reset_runner
+    dispose_engines(close=False)
+    reset_runner()
+    clear_monitors()
+
+def __getattr__(name):
+    # `webapp.wsgi:app` for gunicorn and other WSGI servers, built on first access
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")